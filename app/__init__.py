@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
@@ -14,14 +14,32 @@ def create_app(config_class=Config):
     CORS(app, resources={
         r"/api/*": {
             "origins": "*",  
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
-            "allow_headers": ["Content-Type", "Authorization"]  
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"], 
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+            "expose_headers": ["X-Next-After-Id", "ETag"]
         }
     })
 
+    from app import json_provider, compression
+    json_provider.init_app(app)
+    compression.init_app(app)
+
     db.init_app(app)
     migrate.init_app(app, db)
 
+    from app import matching
+    matching.init_app(app)
+
+    from app.response_cache import response_cache
+    response_cache.init_app(app)
+
+    from app.write_behind import metric_writes
+    metric_writes.init_app(app)
+
+    from app.commands import embeddings_cli, hashtags_cli
+    app.cli.add_command(embeddings_cli)
+    app.cli.add_command(hashtags_cli)
+
     # Register Blueprints
     from app.routes.influencers import influencers_bp
     from app.routes.brands import brands_bp
@@ -35,4 +53,8 @@ def create_app(config_class=Config):
     def index():
         return "CreatoRain Influencers API is running."
 
+    @app.route('/api/cache/stats')
+    def cache_stats():
+        return jsonify(response_cache.stats())
+
     return app
\ No newline at end of file
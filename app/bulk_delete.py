@@ -0,0 +1,142 @@
+# bulk_delete.py
+from flask import abort
+from sqlalchemy import any_, delete, func, select, update
+from app.etag import bump_table_versions
+from app.hashtag_stats import STATS_VERSION
+from app.pagination import parse_ids
+from app.models import Influencer, Brand, Hashtag, influencer_brand, influencer_hashtag
+from app.vector_index import RANGE_FILTERS
+
+hashtags = Hashtag.__table__
+
+
+MAX_DELETE_IDS = 10000
+
+
+def categorical_filters(fields):
+    """Filter parser accepting a string or list of strings for each of `fields`."""
+    def parse(raw):
+        if not isinstance(raw, dict):
+            raise ValueError("filters must be an object.")
+        parsed = {}
+        for field, value in raw.items():
+            if field not in fields:
+                raise ValueError(f"Unsupported filter: {field}")
+            values = value if isinstance(value, list) else [value]
+            if not values or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"Filter {field} takes a string or a non-empty list of strings.")
+            parsed[field] = tuple(values)
+        return parsed
+    return parse
+
+
+def parse_selection(data, parse_filters):
+    """
+    (ids, filters) from a bulk delete body holding exactly one of `ids` or `filters`.
+
+    Empty filters are rejected rather than read as "delete everything".
+    """
+    if not isinstance(data, dict) or ('ids' in data) == ('filters' in data):
+        abort(400, description="Provide either ids or filters.")
+    if 'ids' in data:
+        return parse_ids(data['ids'], MAX_DELETE_IDS), None
+    try:
+        filters = parse_filters(data['filters'])
+    except ValueError as e:
+        abort(400, description=str(e))
+    if not filters:
+        abort(400, description="filters must not be empty.")
+    return None, filters
+
+
+def filter_conditions(model, filters):
+    """
+    WHERE clauses for parsed filters: a tuple of allowed values per
+    categorical field, a (min, max) pair per range field.
+    """
+    conditions = []
+    for field, value in filters.items():
+        column = getattr(model, field)
+        if field in RANGE_FILTERS:
+            low, high = value
+            if low is not None:
+                conditions.append(column >= low)
+            if high is not None:
+                conditions.append(column <= high)
+        else:
+            conditions.append(column.in_(value))
+    return conditions
+
+
+def lock_ids(session, model, ids=None, filters=None):
+    """
+    Ids of the existing rows matching `ids` or `filters`, locked FOR UPDATE.
+
+    The lock keeps concurrent writers from adding association rows that
+    point at them before the delete commits. Filters select at most
+    MAX_DELETE_IDS rows per call, so memory stays bounded however many rows
+    match; the second value says whether more rows matched.
+    """
+    stmt = select(model.id).order_by(model.id).with_for_update()
+    if ids is not None:
+        return session.execute(stmt.where(model.id == any_(ids))).scalars().all(), False
+    stmt = stmt.where(*filter_conditions(model, filters)).limit(MAX_DELETE_IDS + 1)
+    found = session.execute(stmt).scalars().all()
+    return found[:MAX_DELETE_IDS], len(found) > MAX_DELETE_IDS
+
+
+def delete_influencers(session, ids):
+    """
+    Delete influencers and their association rows, set-based; the caller commits.
+
+    The influencer_hashtag rows are removed by a DELETE ... RETURNING inside a
+    CTE whose rows are aggregated straight into the hashtag aggregates, so no
+    association row ever reaches Python.
+    """
+    if not ids:
+        return
+    removed = (
+        delete(influencer_hashtag)
+        .where(influencer_hashtag.c.influencer_id == any_(ids))
+        .returning(influencer_hashtag.c.hashtag_id, influencer_hashtag.c.usage_count)
+        .cte('removed')
+    )
+    per_hashtag = (
+        select(
+            removed.c.hashtag_id,
+            func.count().label('influencers'),
+            func.coalesce(func.sum(removed.c.usage_count), 0).label('uses')
+        )
+        .group_by(removed.c.hashtag_id)
+        .subquery()
+    )
+    session.execute(
+        update(hashtags)
+        .where(hashtags.c.id == per_hashtag.c.hashtag_id)
+        .values(
+            influencer_count=hashtags.c.influencer_count - per_hashtag.c.influencers,
+            total_uses=hashtags.c.total_uses - per_hashtag.c.uses
+        )
+        .add_cte(removed)
+    )
+    session.execute(delete(influencer_brand).where(influencer_brand.c.influencer_id == any_(ids)))
+    session.execute(delete(Influencer.__table__).where(Influencer.id == any_(ids)))
+    bump_table_versions(session, ['influencer_hashtag', STATS_VERSION, 'influencer_brand', 'influencers'])
+
+
+def delete_brands(session, ids):
+    """Delete brands and their influencer_brand rows, set-based; the caller commits."""
+    if not ids:
+        return
+    session.execute(delete(influencer_brand).where(influencer_brand.c.brand_id == any_(ids)))
+    session.execute(delete(Brand.__table__).where(Brand.id == any_(ids)))
+    bump_table_versions(session, ['influencer_brand', 'brands'])
+
+
+def delete_hashtags(session, ids):
+    """Delete hashtags and their influencer_hashtag rows, set-based; the caller commits."""
+    if not ids:
+        return
+    session.execute(delete(influencer_hashtag).where(influencer_hashtag.c.hashtag_id == any_(ids)))
+    session.execute(delete(hashtags).where(hashtags.c.id == any_(ids)))
+    bump_table_versions(session, ['influencer_hashtag', 'hashtags'])
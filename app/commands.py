@@ -0,0 +1,73 @@
+# commands.py
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+embeddings_cli = AppGroup('embeddings', help='Build the influencer embeddings searched by /match.')
+hashtags_cli = AppGroup('hashtags', help='Maintain hashtag search structures.')
+
+
+@embeddings_cli.command('build')
+@click.option('--path', default=None, help='Index directory (defaults to VECTOR_INDEX_PATH).')
+@click.option('--batch-size', default=256, show_default=True, help='Rows streamed and encoded per batch.')
+@click.option('--full', is_flag=True, help='Re-encode every influencer instead of only changed text.')
+@click.option('--quantized-path', default=None, help='Also write an int8 copy for VECTOR_BACKEND=quantized.')
+def build_embeddings_command(path, batch_size, full, quantized_path):
+    """Embed new and changed influencers into the local vector index."""
+    from app.embedding_pipeline import build_embeddings
+
+    path = path or current_app.config['VECTOR_INDEX_PATH']
+    if not path:
+        raise click.UsageError("Pass --path or set VECTOR_INDEX_PATH.")
+    stats = build_embeddings(path, batch_size=batch_size, full=full, quantized_path=quantized_path)
+    click.echo(
+        f"{stats['vectors']} vectors: {stats['encoded']} encoded, {stats['reused']} reused, "
+        f"{stats['skipped']} without text, {stats['removed']} removed"
+    )
+
+
+@embeddings_cli.command('build-ivf')
+@click.option('--source', default=None, help='Float32 index directory (defaults to VECTOR_INDEX_PATH).')
+@click.option('--path', required=True, help='Output directory for VECTOR_BACKEND=ivf.')
+@click.option('--nlist', default=None, type=int, help='Number of inverted lists (default 4 * sqrt(n)).')
+@click.option('--iterations', default=20, show_default=True, help='k-means iterations.')
+def build_ivf_command(source, path, nlist, iterations):
+    """Cluster a built index into an IVF index for approximate search."""
+    from app.ivf_index import IVFIndex
+    from app.vector_index import NumpyIndex, save_atomic
+
+    source = source or current_app.config['VECTOR_INDEX_PATH']
+    if not source:
+        raise click.UsageError("Pass --source or set VECTOR_INDEX_PATH.")
+    index = IVFIndex.from_index(NumpyIndex.load(source), nlist=nlist, iterations=iterations)
+    save_atomic(index, path)
+    click.echo(f"IVF index with {len(index.ids)} vectors in {len(index.centroids)} lists written to {path}")
+
+
+@hashtags_cli.command('create-search-index')
+def create_search_index_command():
+    """Add the pg_trgm index used by /api/hashtags/search to an existing database."""
+    from app import db
+
+    db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_hashtags_name_trgm ON hashtags USING gin (name gin_trgm_ops)"
+    ))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_influencer_hashtag_hashtag_id "
+        "ON influencer_hashtag (hashtag_id, influencer_id)"
+    ))
+    db.session.commit()
+    click.echo("Hashtag search indexes are in place.")
+
+
+@hashtags_cli.command('refresh-stats')
+def refresh_stats_command():
+    """Recompute every hashtag's influencer_count and total_uses."""
+    from app import db
+    from app.hashtag_stats import refresh_hashtag_stats
+
+    refresh_hashtag_stats(db.session)
+    db.session.commit()
+    click.echo("Hashtag aggregates refreshed.")
@@ -0,0 +1,64 @@
+# compression.py
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Encodings in order of preference; an ETag gets the encoding as a suffix
+CONTENT_ENCODINGS = ('br', 'gzip')
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+
+def _available(encoding):
+    return encoding == 'gzip' or brotli is not None
+
+
+def choose_encoding():
+    """Best encoding the client accepts, or None."""
+    accept = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in CONTENT_ENCODINGS:
+        quality = accept[encoding]
+        if quality > best_quality and _available(encoding):
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['BROTLI_QUALITY'])
+    # mtime=0 keeps the output, and so the ETag's body, the same for the same input
+    return gzip.compress(data, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+def compress_response(response):
+    """Compress a buffered response body above COMPRESSION_MIN_SIZE bytes."""
+    config = current_app.config
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < config['COMPRESSION_MIN_SIZE']:
+        return response
+    response.set_data(compress(data, encoding, config))
+    response.headers['Content-Encoding'] = encoding
+    # Each encoding is a different representation, so it needs its own strong tag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def init_app(app):
+    if app.config['COMPRESS_RESPONSES']:
+        app.after_request(compress_response)
@@ -0,0 +1,130 @@
+# embedding_pipeline.py
+import hashlib
+import logging
+import os
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Influencer, geo_location
+from app.matching import get_model
+from app.vector_index import NumpyIndex, QuantizedIndex, save_atomic
+
+logger = logging.getLogger(__name__)
+
+# Columns whose text is embedded; a row is re-encoded only when these change
+TEXT_COLUMNS = ('bio', 'video_desc', 'audience_desc')
+
+STREAMED_COLUMNS = (
+    Influencer.id, Influencer.username, Influencer.bio, Influencer.video_desc,
+    Influencer.audience_desc, Influencer.followers_count, Influencer.average_views,
+    Influencer.engagement_rate, Influencer.creator_city, Influencer.creator_state,
+    Influencer.creator_country, Influencer.creator_gender, Influencer.instagram_link,
+    Influencer.youtube_link, Influencer.most_recent_upload, Influencer.verified
+)
+
+
+def influencer_text(row):
+    """Text embedded for an influencer, or '' when there is nothing to embed."""
+    return '\n'.join(getattr(row, col) for col in TEXT_COLUMNS if getattr(row, col)).strip()
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def influencer_metadata(row):
+    """Metadata stored next to each vector; matches what /match reads from Pinecone."""
+    return {
+        'id': row.id,
+        'username': row.username,
+        'followers_count': row.followers_count or 0,
+        'platforms': ['TikTok'],
+        'contact_instagram': row.instagram_link,
+        'youtube_channel': row.youtube_link,
+        'geolocation': geo_location(row.creator_city, row.creator_state, row.creator_country),
+        'creator_country': row.creator_country,
+        'creator_gender': row.creator_gender,
+        'verified': row.verified,
+        'engagement_rate': row.engagement_rate,
+        'average_views': row.average_views,
+        'most_recent_upload': row.most_recent_upload.isoformat() if row.most_recent_upload else None
+    }
+
+
+def load_previous(path):
+    """Vectors and content hashes from an earlier build, keyed by influencer id."""
+    hashes_path = os.path.join(path, 'hashes.npy')
+    if not os.path.exists(hashes_path):
+        return {}, None
+    index = NumpyIndex.load(path)
+    hashes = np.load(hashes_path)
+    previous = {int(i): (h, row) for row, (i, h) in enumerate(zip(index.ids, hashes.tolist()))}
+    return previous, index.vectors
+
+
+def write_store(path, ids, vectors, hashes, metadata, quantized_path=None):
+    """Write the new store next to the old one, then swap it into place."""
+    save_atomic(NumpyIndex(ids, vectors, metadata), path,
+                arrays={'hashes.npy': np.array(hashes, dtype='U32')})
+    if quantized_path:
+        save_atomic(QuantizedIndex.from_vectors(ids, vectors, metadata), quantized_path)
+
+
+def build_embeddings(path, batch_size=256, full=False, quantized_path=None):
+    """
+    Embed influencers into a NumPy index directory, re-encoding only rows whose
+    text changed since the previous build.
+
+    Args:
+        path (str): Index directory (ids.npy, vectors.npy, metadata.json, hashes.npy)
+        batch_size (int): Rows fetched per server-side cursor batch and encoded together
+        full (bool): Ignore the previous build and re-encode every row
+        quantized_path (str): Also write an int8 copy for the quantized backend
+    """
+    previous, previous_vectors = ({}, None) if full else load_previous(path)
+    model = get_model()
+
+    ids, hashes, metadata, vector_batches = [], [], [], []
+    encoded = reused = skipped = 0
+
+    stmt = select(*STREAMED_COLUMNS).order_by(Influencer.id).execution_options(yield_per=batch_size)
+    for rows in db.session.execute(stmt).partitions():
+        kept, batch_vectors = [], []
+        to_encode, texts = [], []
+        for row in rows:
+            text = influencer_text(row)
+            if not text:
+                skipped += 1
+                continue
+            digest = content_hash(text)
+            old = previous.get(row.id)
+            if old is not None and old[0] == digest:
+                batch_vectors.append(previous_vectors[old[1]])
+                reused += 1
+            else:
+                to_encode.append(len(kept))
+                texts.append(text)
+                batch_vectors.append(None)
+            kept.append((row, digest))
+        if texts:
+            new_vectors = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+            for position, vector in zip(to_encode, new_vectors):
+                batch_vectors[position] = vector
+            encoded += len(texts)
+        for position, (row, digest) in enumerate(kept):
+            ids.append(row.id)
+            hashes.append(digest)
+            metadata.append(influencer_metadata(row))
+            vector_batches.append(batch_vectors[position])
+        logger.info(f"Embedded {len(ids)} influencers ({encoded} encoded, {reused} reused)")
+
+    dimension = model.get_sentence_embedding_dimension()
+    vectors = np.vstack(vector_batches) if vector_batches else np.empty((0, dimension), dtype=np.float32)
+    write_store(path, ids, vectors, hashes, metadata, quantized_path)
+    removed = len(set(previous) - set(ids))
+    logger.info(
+        f"Embedding build completed: {len(ids)} vectors, {encoded} encoded, {reused} reused, "
+        f"{skipped} without text, {removed} removed"
+    )
+    return {'vectors': len(ids), 'encoded': encoded, 'reused': reused,
+            'skipped': skipped, 'removed': removed}
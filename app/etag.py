@@ -0,0 +1,130 @@
+# etag.py
+import hashlib
+from functools import wraps
+from itertools import chain
+from flask import current_app, g, request
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import ColumnProperty, Session
+from app import db
+from app.models import TableVersion
+from app.compression import CONTENT_ENCODINGS
+
+versions = TableVersion.__table__
+
+
+def bump_table_versions(session, tables):
+    """
+    Mark `tables` as changed by the session's current transaction.
+
+    The counters are incremented once per transaction, just before it
+    commits, so readers see the new version exactly when they can see the
+    write. ORM flushes are recorded by the listener below; Core and raw SQL
+    writes call this themselves.
+    """
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def _increment_versions(connection, tables):
+    # Sorted and taken only at commit, so writers lock the counter rows in one
+    # order and hold them for no longer than the commit itself
+    names = sorted(set(tables))
+    result = connection.execute(
+        update(versions)
+        .where(versions.c.table_name.in_(names))
+        .values(version=versions.c.version + 1)
+    )
+    if result.rowcount < len(names):
+        existing = set(connection.execute(
+            select(versions.c.table_name).where(versions.c.table_name.in_(names))
+        ).scalars())
+        connection.execute(insert(versions), [
+            {'table_name': name, 'version': 1} for name in names if name not in existing
+        ])
+
+
+def flushed_tables(session):
+    """Names of the tables a pending flush writes to, including association tables."""
+    tables = set()
+    for obj in chain(session.new, session.deleted):
+        mapper = inspect(obj).mapper
+        tables.update(table.name for table in mapper.tables)
+        tables.update(rel.secondary.name for rel in mapper.relationships if rel.secondary is not None)
+    for obj in session.dirty:
+        state = inspect(obj)
+        for attr in state.attrs:
+            if not attr.history.has_changes():
+                continue
+            prop = state.mapper.attrs[attr.key]
+            if isinstance(prop, ColumnProperty):
+                tables.add(state.mapper.local_table.name)
+            elif prop.secondary is not None:
+                tables.add(prop.secondary.name)
+    return tables
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_tables(session, flush_context):
+    # New/dirty/deleted and attribute history still hold their pre-flush state here
+    bump_table_versions(session, flushed_tables(session))
+
+
+@event.listens_for(Session, 'before_commit')
+def _increment_changed_tables(session):
+    # commit() flushes after this hook runs, so flush first to record those tables too
+    session.flush()
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        _increment_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_changed_tables(session, transaction):
+    # A rolled back transaction changed nothing
+    if transaction.parent is None:
+        session.info.pop('changed_tables', None)
+
+
+def table_versions(tables):
+    """
+    Change counter of each table, 0 for tables never written.
+
+    Read once per request, so the ETag and the response cache key of one
+    request always agree.
+    """
+    known = g.setdefault('table_versions', {})
+    missing = [name for name in tables if name not in known]
+    if missing:
+        rows = dict(db.session.execute(
+            select(versions.c.table_name, versions.c.version)
+            .where(versions.c.table_name.in_(missing))
+        ).all())
+        known.update((name, rows.get(name, 0)) for name in missing)
+    return tuple(known[name] for name in tables)
+
+
+def conditional(*tables):
+    """
+    Give a GET view a strong ETag derived from the versions of `tables`.
+
+    A request whose If-None-Match matches gets a 304 without the view running,
+    so nothing is queried or serialized beyond the one version lookup.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Read the versions before the data: a concurrent write can then only
+            # leave the tag older than the body, which costs one extra 200
+            key = repr((request.full_path, table_versions(tables)))
+            etag = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+            # The compressed variants carry the same tag plus an encoding suffix
+            for tag in (etag, *(f'{etag}-{encoding}' for encoding in CONTENT_ENCODINGS)):
+                if request.if_none_match.contains_weak(tag):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(tag)
+                    return response
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,81 @@
+# fields.py
+import math
+from datetime import date, datetime
+from flask import request, abort
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, Integer, String
+
+MAX_INTEGER = 2 ** 31 - 1
+MAX_BIGINT = 2 ** 63 - 1
+
+
+def column_names(model):
+    return [column.key for column in model.__table__.columns]
+
+
+def requested_fields(model, default, extra=()):
+    """
+    Field names from the comma-separated `fields` query argument.
+
+    Accepts the model's columns plus any `extra` names (e.g. relationships the
+    route knows how to load); `id` is always included. Falls back to `default`.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    allowed = set(column_names(model)) | set(extra)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    if 'id' not in names:
+        names.insert(0, 'id')
+    return names
+
+
+def field_columns(model, fields):
+    """Mapped columns for the plain column names in `fields`, for a Core select."""
+    columns = set(column_names(model))
+    return [getattr(model, name) for name in fields if name in columns]
+
+
+def column_value(column, value):
+    """
+    A JSON request value converted for `column`; raises ValueError when it cannot be.
+
+    Checks the value against the column type before any SQL runs, so a wrong
+    type is a 400 instead of a bind or driver error. Dates and datetimes are
+    accepted as ISO-8601 strings.
+    """
+    name = column.key
+    kind = column.type
+    if value is None:
+        if not column.nullable:
+            raise ValueError(f"{name} cannot be null.")
+        return None
+    if isinstance(kind, Boolean):
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be a boolean.")
+        return value
+    if isinstance(kind, Integer):
+        limit = MAX_BIGINT if isinstance(kind, BigInteger) else MAX_INTEGER
+        if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+                or value != int(value) or not -limit - 1 <= value <= limit):
+            raise ValueError(f"{name} must be an integer between {-limit - 1} and {limit}.")
+        return int(value)
+    if isinstance(kind, Float):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number.")
+        return float(value)
+    if isinstance(kind, (DateTime, Date)):
+        parse = datetime.fromisoformat if isinstance(kind, DateTime) else date.fromisoformat
+        try:
+            return parse(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an ISO-8601 date string.") from None
+    if isinstance(kind, String):
+        if not isinstance(value, str):
+            raise ValueError(f"{name} must be a string.")
+        if kind.length is not None and len(value) > kind.length:
+            raise ValueError(f"{name} must be at most {kind.length} characters.")
+        return value
+    return value
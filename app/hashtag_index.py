@@ -0,0 +1,51 @@
+# hashtag_index.py
+from bisect import bisect_left
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Hashtag
+from app.snapshot import BackgroundSnapshot
+
+
+class HashtagPrefixIndex(BackgroundSnapshot):
+    """Hashtag names sorted case-insensitively, with a popularity score per name.
+
+    Prefix completion is two bisects to find the matching slice, then a
+    partial sort of that slice by popularity.
+    """
+
+    ttl_config = 'HASHTAG_INDEX_TTL'
+
+    def load(self):
+        rows = db.session.execute(select(Hashtag.id, Hashtag.name, Hashtag.total_uses)).all()
+        rows.sort(key=lambda row: row[1].lower())
+        return {
+            'keys': [row[1].lower() for row in rows],
+            'names': [row[1] for row in rows],
+            'ids': np.array([row[0] for row in rows], dtype=np.int64),
+            'popularity': np.array([row[2] for row in rows], dtype=np.int64)
+        }
+
+    def complete(self, prefix, limit=10):
+        """The `limit` most popular hashtags whose name starts with `prefix`."""
+        data = self.current()
+        prefix = prefix.lower()
+        start = bisect_left(data['keys'], prefix)
+        end = bisect_left(data['keys'], prefix + '\U0010ffff', lo=start)
+        if start == end:
+            return []
+        popularity = data['popularity'][start:end]
+        k = min(limit, end - start)
+        top = np.argpartition(-popularity, k - 1)[:k]
+        top = top[np.argsort(-popularity[top], kind='stable')]
+        return [
+            {
+                'id': int(data['ids'][start + i]),
+                'name': data['names'][start + i],
+                'total_uses': int(popularity[i])
+            }
+            for i in top
+        ]
+
+
+hashtag_prefix_index = HashtagPrefixIndex()
@@ -0,0 +1,118 @@
+# hashtag_stats.py
+from sqlalchemy import bindparam, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.etag import bump_table_versions
+from app.models import Hashtag, influencer_hashtag
+
+hashtags = Hashtag.__table__
+
+# Change counter bumped for influencer_count/total_uses updates. It is kept apart
+# from 'hashtags', so usage traffic leaves the hashtag list's ETag and cache alone
+STATS_VERSION = 'hashtag_stats'
+
+
+def refresh_hashtag_stats(session, hashtag_ids=None):
+    """
+    Recompute influencer_count and total_uses from influencer_hashtag.
+
+    Args:
+        session: SQLAlchemy session or connection; the caller commits
+        hashtag_ids (iterable): Only refresh these hashtags (all when None)
+    """
+    influencer_count = (
+        select(func.count())
+        .where(influencer_hashtag.c.hashtag_id == hashtags.c.id)
+        .scalar_subquery()
+    )
+    total_uses = (
+        select(func.coalesce(func.sum(influencer_hashtag.c.usage_count), 0))
+        .where(influencer_hashtag.c.hashtag_id == hashtags.c.id)
+        .scalar_subquery()
+    )
+    stmt = update(hashtags).values(influencer_count=influencer_count, total_uses=total_uses)
+    if hashtag_ids is not None:
+        hashtag_ids = list(hashtag_ids)
+        if not hashtag_ids:
+            return
+        stmt = stmt.where(hashtags.c.id.in_(hashtag_ids))
+    session.execute(stmt)
+    bump_table_versions(session, [STATS_VERSION])
+
+
+def apply_hashtag_deltas(session, deltas):
+    """
+    Adjust the stored aggregates in place.
+
+    Args:
+        session: SQLAlchemy session or connection; the caller commits
+        deltas (dict): hashtag_id -> (influencer_count change, total_uses change)
+    """
+    params = [
+        {'b_id': hashtag_id, 'b_count': count, 'b_uses': uses}
+        # In id order, so concurrent writers lock hashtag rows in the same order
+        for hashtag_id, (count, uses) in sorted(deltas.items()) if count or uses
+    ]
+    if not params:
+        return
+    stmt = (
+        update(hashtags)
+        .where(hashtags.c.id == bindparam('b_id'))
+        .values(
+            influencer_count=hashtags.c.influencer_count + bindparam('b_count'),
+            total_uses=hashtags.c.total_uses + bindparam('b_uses')
+        )
+    )
+    session.execute(stmt, params)
+    bump_table_versions(session, [STATS_VERSION])
+
+
+def association_usage(influencer_id, hashtag_id):
+    """usage_count of one influencer_hashtag row, or None when it does not exist."""
+    return db.session.execute(
+        select(func.coalesce(influencer_hashtag.c.usage_count, 0)).where(
+            influencer_hashtag.c.influencer_id == influencer_id,
+            influencer_hashtag.c.hashtag_id == hashtag_id
+        )
+    ).scalar_one_or_none()
+
+
+def record_hashtag_usage(session, usage, chunk_size=5000):
+    """
+    Add usage to influencer_hashtag rows, creating the missing associations.
+
+    Each chunk is one INSERT ... ON CONFLICT DO UPDATE that adds to
+    usage_count. RETURNING (xmax = 0) marks the associations it created, so
+    the hashtag aggregates get +1 influencer only for those. The caller commits.
+
+    Args:
+        session: SQLAlchemy session or connection
+        usage (dict): (influencer_id, hashtag_id) -> usage to add, duplicates already summed
+
+    Returns:
+        int: how many associations were created
+    """
+    rows = [
+        {'influencer_id': influencer_id, 'hashtag_id': hashtag_id, 'usage_count': delta}
+        for (influencer_id, hashtag_id), delta in usage.items()
+    ]
+    stmt = insert(influencer_hashtag)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[influencer_hashtag.c.influencer_id, influencer_hashtag.c.hashtag_id],
+        set_={'usage_count': func.coalesce(influencer_hashtag.c.usage_count, 0) + stmt.excluded.usage_count}
+    ).returning(
+        influencer_hashtag.c.influencer_id,
+        influencer_hashtag.c.hashtag_id,
+        literal_column('xmax = 0').label('inserted')
+    )
+
+    deltas = {}
+    created = 0
+    for start in range(0, len(rows), chunk_size):
+        for row in session.execute(stmt.values(rows[start:start + chunk_size])):
+            count, uses = deltas.get(row.hashtag_id, (0, 0))
+            deltas[row.hashtag_id] = (count + int(row.inserted), uses + usage[(row.influencer_id, row.hashtag_id)])
+            created += int(row.inserted)
+    bump_table_versions(session, ['influencer_hashtag'])
+    apply_hashtag_deltas(session, deltas)
+    return created
@@ -0,0 +1,105 @@
+# influencer_upsert.py
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import StatementError
+from app.etag import bump_table_versions
+from app.fields import column_names, column_value
+from app.models import Influencer
+
+influencers = Influencer.__table__
+
+# Columns a record may set; id is always assigned by the database
+UPSERT_COLUMNS = frozenset(column_names(Influencer)) - {'id'}
+
+
+def validate_record(record):
+    """
+    A record's values converted for their columns, and an error message.
+
+    Returns (values, None) for a valid record and (None, message) otherwise,
+    so a record with a bad field fails alone instead of its whole chunk.
+    """
+    if not isinstance(record, dict):
+        return None, "Record must be an object."
+    if not isinstance(record.get('username'), str) or not record['username']:
+        return None, "username is required."
+    unknown = sorted(set(record) - UPSERT_COLUMNS)
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+    try:
+        return {name: column_value(influencers.c[name], value) for name, value in record.items()}, None
+    except ValueError as e:
+        return None, str(e)
+
+
+def upsert_statement(columns):
+    """
+    INSERT ... ON CONFLICT (username) DO UPDATE for records with the given columns.
+
+    Only the supplied columns are overwritten on conflict. RETURNING reports
+    `xmax = 0`, which is true only for rows this statement inserted.
+    """
+    stmt = insert(influencers)
+    updates = {name: stmt.excluded[name] for name in columns if name != 'username'}
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=['username'],
+            # A bare username still needs a SET for RETURNING to report the existing row
+            set_=updates or {'username': stmt.excluded.username}
+        )
+        .returning(influencers.c.id, influencers.c.username, literal_column('xmax = 0').label('inserted'))
+    )
+
+
+def upsert_influencers(session, records, chunk_size=1000):
+    """
+    Insert or update influencers by username, one multi-row statement per chunk.
+
+    Records naming the same username are merged in order (later fields win),
+    since one statement cannot update a row twice. Records are grouped by the
+    set of fields they carry, so absent fields are never overwritten. Each
+    chunk commits on its own; a chunk the database rejects is rolled back and
+    its records reported as errors.
+
+    Returns:
+        list: one {'index', 'username', 'status', 'id' or 'error'} per record,
+        in request order, with status 'created', 'updated' or 'error'
+    """
+    results = [None] * len(records)
+    merged = {}
+    positions = {}
+    for index, record in enumerate(records):
+        values, error = validate_record(record)
+        if error:
+            username = record.get('username') if isinstance(record, dict) else None
+            results[index] = {'index': index, 'username': username, 'status': 'error', 'error': error}
+            continue
+        merged.setdefault(record['username'], {}).update(values)
+        positions.setdefault(record['username'], []).append(index)
+
+    groups = {}
+    for username, record in merged.items():
+        groups.setdefault(frozenset(record), []).append(record)
+
+    for columns, group in groups.items():
+        stmt = upsert_statement(columns)
+        for start in range(0, len(group), chunk_size):
+            chunk = group[start:start + chunk_size]
+            try:
+                rows = session.execute(stmt.values(chunk)).all()
+                bump_table_versions(session, ['influencers'])
+                session.commit()
+            except StatementError as e:
+                # Database rejections (DBAPIError) and values a bind processor refuses
+                session.rollback()
+                error = str(e.orig).strip() if e.orig is not None else str(e)
+                outcomes = {record['username']: {'status': 'error', 'error': error} for record in chunk}
+            else:
+                outcomes = {
+                    row.username: {'status': 'created' if row.inserted else 'updated', 'id': row.id}
+                    for row in rows
+                }
+            for username, outcome in outcomes.items():
+                for index in positions[username]:
+                    results[index] = dict({'index': index, 'username': username}, **outcome)
+    return results
@@ -0,0 +1,130 @@
+# ivf_index.py
+import os
+import numpy as np
+from app.vector_index import MetadataTable, NumpyIndex, _as_matrix, _normalize, as_metadata_table
+
+# Bytes of the float32 (rows x nlist) score matrix computed per assignment block
+ASSIGN_MEMORY_BYTES = 256 * 2**20
+
+
+def _assign(vectors, centroids):
+    """Index of the most similar centroid for every row."""
+    block_size = max(1, ASSIGN_MEMORY_BYTES // (4 * len(centroids)))
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        assign[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def kmeans(vectors, nlist, iterations=20, sample_per_list=256, seed=0):
+    """Spherical k-means on a sample of normalized vectors; returns nlist unit centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * sample_per_list)
+    sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind='stable')
+        lists, starts = np.unique(assign[order], return_index=True)
+        centroids[lists] = np.add.reduceat(sample[order], starts, axis=0)
+        # Re-seed empty lists from random sample points
+        empty = np.setdiff1d(np.arange(nlist), lists)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex(NumpyIndex):
+    """Approximate search over an inverted-file index.
+
+    Vectors are clustered around `nlist` k-means centroids and stored
+    contiguously list by list; rows offsets[i]:offsets[i + 1] belong to list i.
+    A query scans only the `nprobe` lists whose centroids are closest to it.
+
+    `vectors` must already be L2-normalized float32 rows, as `build` and
+    `save` leave them; `load` memory-maps them, so a query only pages in the
+    lists it probes.
+    """
+
+    def __init__(self, ids, vectors, metadata, centroids, offsets, nprobe=8):
+        self.ids = np.asarray(ids)
+        self.vectors = vectors
+        self.dimension = vectors.shape[1]
+        self._init_metadata(metadata)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, ids, vectors, metadata, nlist=None, nprobe=8, iterations=20, seed=0):
+        """Cluster the vectors and lay them out as contiguous inverted lists."""
+        vectors = _normalize(_as_matrix(vectors, len(ids)))
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(ids))))
+        nlist = min(nlist, len(ids))
+        centroids = kmeans(vectors, nlist, iterations=iterations, seed=seed)
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(
+            np.asarray(ids)[order], vectors[order], as_metadata_table(metadata).take(order),
+            centroids, offsets, nprobe=nprobe
+        )
+
+    @classmethod
+    def from_index(cls, index, nlist=None, nprobe=8, iterations=20, seed=0):
+        return cls.build(index.ids, index.vectors, index.metadata, nlist, nprobe, iterations, seed)
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        centroids = np.load(os.path.join(path, 'centroids.npy'))
+        offsets = np.load(os.path.join(path, 'offsets.npy'))
+        metadata = MetadataTable.load(path, mmap_mode='r')
+        return cls(ids, vectors, metadata, centroids, offsets, nprobe=nprobe)
+
+    def save(self, path):
+        super().save(path)
+        np.save(os.path.join(path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(path, 'offsets.npy'), self.offsets)
+
+    def _probe(self, vector, list_scores, top_k, nprobe, mask):
+        """Scan the closest lists; with a filter, keep probing until top_k rows pass it."""
+        row_blocks, score_blocks = [], []
+        found = 0
+        for probed, i in enumerate(np.argsort(-list_scores)):
+            if probed >= nprobe and (mask is None or found >= top_k):
+                break
+            start, end = self.offsets[i], self.offsets[i + 1]
+            rows = np.arange(start, end)
+            scores = self.vectors[start:end] @ vector
+            if mask is not None:
+                keep = mask[start:end]
+                rows, scores = rows[keep], scores[keep]
+            row_blocks.append(rows)
+            score_blocks.append(scores)
+            found += len(rows)
+        if not row_blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(row_blocks), np.concatenate(score_blocks)
+
+    def query_many(self, vectors, top_k=20, include_metadata=True, filter=None, nprobe=None):
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        mask = self.filter_mask(filter) if filter else None
+        centroid_scores = vectors @ self.centroids.T
+        results = []
+        for vector, list_scores in zip(vectors, centroid_scores):
+            rows, scores = self._probe(vector, list_scores, top_k, nprobe or self.nprobe, mask)
+            results.append(self._search_rows(scores, top_k, rows, include_metadata))
+        return results
+
+    def query(self, vector, top_k=20, include_metadata=True, filter=None, nprobe=None):
+        return self.query_many([vector], top_k, include_metadata, filter, nprobe)[0]
+
+    def describe_index_stats(self):
+        stats = super().describe_index_stats()
+        stats.update({'nlist': int(len(self.centroids)), 'nprobe': int(self.nprobe)})
+        return stats
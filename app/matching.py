@@ -0,0 +1,240 @@
+# matching.py
+import json
+import logging
+import threading
+import warnings
+import numpy as np
+from flask import current_app
+from app.cache import LRUCache, TTLCache
+from app.ranking import rerank, DEFAULT_WEIGHTS
+from app.vector_index import create_index, CATEGORICAL_FILTERS, RANGE_FILTERS
+
+warnings.filterwarnings('ignore')
+
+logger = logging.getLogger(__name__)
+
+# The embedding model and vector index are loaded on first use (or by the
+# warm-up thread) so importing the app never blocks on them.
+_model = None
+_index = None
+_model_lock = threading.Lock()
+_index_lock = threading.Lock()
+_warmup_thread = None
+_warmup_error = None
+
+# Query text -> float32 embedding, so repeated briefs skip model.encode
+query_embedding_cache = LRUCache()
+
+# Formatted /match responses, tagged with the influencer ids they contain
+match_result_cache = TTLCache()
+
+
+def init_app(app):
+    query_embedding_cache.maxsize = app.config['QUERY_EMBEDDING_CACHE_SIZE']
+    match_result_cache.maxsize = app.config['MATCH_RESULT_CACHE_SIZE']
+    match_result_cache.ttl = app.config['MATCH_RESULT_CACHE_TTL']
+    if app.config['MATCH_WARMUP']:
+        start_warmup(app)
+
+
+def get_model(config=None):
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                config = config or current_app.config
+                _model = SentenceTransformer(config['EMBEDDING_MODEL_NAME'])
+    return _model
+
+
+def get_index(config=None):
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                config = config or current_app.config
+                # connect to index (Pinecone by default, or a local NumPy index)
+                _index = create_index(
+                    config['VECTOR_BACKEND'],
+                    index_name=config['PINECONE_INDEX_NAME'],
+                    api_key=config['PINECONE_API_KEY'],
+                    path=config['VECTOR_INDEX_PATH'],
+                    nprobe=config['VECTOR_IVF_NPROBE']
+                )
+    return _index
+
+
+def _warm_up(config):
+    global _warmup_error
+    try:
+        get_model(config)
+        index = get_index(config)
+        logger.info(f"Index stats: {index.describe_index_stats()}")
+    except Exception as e:
+        _warmup_error = str(e)
+        logger.error(f"Match warm-up failed: {e}")
+
+
+def start_warmup(app):
+    """Load the model and index in a background thread."""
+    global _warmup_thread
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(
+            target=_warm_up, args=(dict(app.config),), name='match-warmup', daemon=True
+        )
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+def status():
+    """Readiness of the matching stack."""
+    return {
+        'ready': _model is not None and _index is not None,
+        'model_loaded': _model is not None,
+        'index_loaded': _index is not None,
+        'warming_up': _warmup_thread is not None and _warmup_thread.is_alive(),
+        'error': _warmup_error
+    }
+
+
+def _folds_case():
+    """True when the loaded model's tokenizer lowercases its input itself."""
+    tokenizer = getattr(_model, 'tokenizer', None)
+    return bool(getattr(tokenizer, 'do_lower_case', False))
+
+
+def normalize_query(user_query):
+    """
+    Cache key for a query, which is also the text that gets encoded.
+
+    Spacing never changes the tokens. Case is folded only for an uncased
+    tokenizer (the default MiniLM), so a cased EMBEDDING_MODEL_NAME still
+    sees the query as written. Before the model loads nothing is folded.
+    """
+    query = ' '.join(user_query.split())
+    return query.lower() if _folds_case() else query
+
+
+def encode_query(user_query):
+    key = normalize_query(user_query)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = np.asarray(get_model().encode(key), dtype=np.float32)
+        query_embedding_cache.set(key, vector)
+    return vector
+
+
+def encode_queries(user_queries):
+    # Look up every query in the cache, then encode all misses in one batch
+    keys = [normalize_query(q) for q in user_queries]
+    vectors = [query_embedding_cache.get(key) for key in keys]
+    missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+    if missing:
+        encoded = dict(zip(missing, np.asarray(get_model().encode(missing), dtype=np.float32)))
+        for key, vector in encoded.items():
+            query_embedding_cache.set(key, vector)
+        vectors = [encoded[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+    return np.vstack(vectors)
+
+
+def match_cache_key(user_query, num_results, filters, weights):
+    return json.dumps([normalize_query(user_query), num_results, filters, weights], sort_keys=True)
+
+
+def invalidate_match_results(influencer_ids):
+    """
+    Drop cached /match responses that include any of these influencers.
+
+    Only this process's cache is reached; other workers keep their entries
+    until MATCH_RESULT_CACHE_TTL expires them.
+    """
+    return match_result_cache.invalidate_tags(int(i) for i in influencer_ids)
+
+
+def parse_query(value, name='user_query'):
+    """A non-empty query string, or ValueError."""
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{name} must be a non-empty string.")
+    return value
+
+
+def parse_influencer_count(value, max_count):
+    """A whole number of matches between 1 and `max_count`, or ValueError."""
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= max_count:
+        raise ValueError(f"influencer_count must be an integer between 1 and {max_count}.")
+    return value
+
+
+def parse_filters(raw):
+    """Validate /match filters into the form the vector indexes expect.
+
+    Categorical fields take a value or a list of values; range fields take
+    {"min": ..., "max": ...} with either bound optional.
+    """
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object.")
+    parsed = {}
+    for field, value in raw.items():
+        if field in CATEGORICAL_FILTERS:
+            values = value if isinstance(value, list) else [value]
+            if not values:
+                raise ValueError(f"Filter {field} needs at least one value.")
+            if not all(isinstance(v, (str, bool, int, float)) for v in values):
+                raise ValueError(f"Filter {field} values must be strings, numbers or booleans.")
+            parsed[field] = tuple(values)
+        elif field in RANGE_FILTERS:
+            if not isinstance(value, dict) or not set(value) <= {'min', 'max'}:
+                raise ValueError(f"Filter {field} must be an object with min and/or max.")
+            bounds = (value.get('min'), value.get('max'))
+            if not all(b is None or isinstance(b, (int, float)) for b in bounds):
+                raise ValueError(f"Filter {field} bounds must be numbers.")
+            parsed[field] = bounds
+        else:
+            raise ValueError(f"Unsupported filter: {field}")
+    return parsed
+
+
+def _candidate_count(num_results):
+    """How many candidates to fetch so the hybrid re-ranker has room to reorder."""
+    config = current_app.config
+    if not config['MATCH_RERANK']:
+        return num_results
+    return max(num_results, min(num_results * config['MATCH_RERANK_OVERFETCH'],
+                                config['MATCH_RERANK_MAX_CANDIDATES']))
+
+
+def _rerank(index, results, num_results, weights):
+    config = current_app.config
+    if not config['MATCH_RERANK']:
+        return results
+    matches = list(results['matches'])
+    if not matches:
+        return {'matches': []}
+    features = index.candidate_features(results)
+    return {'matches': rerank(matches, features, weights, num_results,
+                              half_life_days=config['MATCH_RECENCY_HALF_LIFE_DAYS'])}
+
+
+def retrieve_from_index(user_query, num_results=20, filters=None, weights=None):
+    index = get_index()
+    results = index.query(
+        encode_query(user_query),
+        top_k=_candidate_count(num_results),
+        include_metadata=True, # Include metadata in the response.
+        filter=filters
+    )
+    return _rerank(index, results, num_results, weights or DEFAULT_WEIGHTS)
+
+
+def retrieve_many_from_index(user_queries, num_results=20, filters=None, weights=None):
+    index = get_index()
+    results = index.query_many(
+        encode_queries(user_queries),
+        top_k=_candidate_count(num_results),
+        include_metadata=True,
+        filter=filters
+    )
+    return [_rerank(index, result, num_results, weights or DEFAULT_WEIGHTS) for result in results]
@@ -1,3 +1,4 @@
+from sqlalchemy import DDL, event
 from app import db
 
 # Association Table: Influencer ↔ Brand
@@ -10,6 +11,8 @@ influencer_brand = db.Table('influencer_brand',
     db.Column('start_date', db.Date),
     db.Column('end_date', db.Date)
 )
+# The primary key leads with influencer_id; this serves lookups by brand
+db.Index('ix_influencer_brand_brand_id', influencer_brand.c.brand_id, influencer_brand.c.influencer_id)
 
 # Association Table: Influencer ↔ Hashtag
 influencer_hashtag = db.Table('influencer_hashtag',
@@ -17,6 +20,12 @@ influencer_hashtag = db.Table('influencer_hashtag',
     db.Column('hashtag_id', db.Integer, db.ForeignKey('hashtags.id'), primary_key=True),
     db.Column('usage_count', db.Integer, default=1)
 )
+# The primary key leads with influencer_id; this serves lookups by hashtag
+db.Index('ix_influencer_hashtag_hashtag_id', influencer_hashtag.c.hashtag_id, influencer_hashtag.c.influencer_id)
+
+def geo_location(city, state, country):
+    """Human-readable location from an influencer's city, state and country."""
+    return ', '.join(part for part in (city, state, country) if part)
 
 class Influencer(db.Model):
     __tablename__ = 'influencers'
@@ -65,11 +74,35 @@ class Brand(db.Model):
 
 class Hashtag(db.Model):
     __tablename__ = 'hashtags'
+    __table_args__ = (
+        # Trigram index so infix ILIKE '%q%' searches don't scan the table
+        db.Index('ix_hashtags_name_trgm', 'name',
+                 postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     topic = db.Column(db.String(100))
     description = db.Column(db.String(255))
+    # Aggregates of influencer_hashtag, kept current by the association writes
+    # (see app/hashtag_stats.py); rebuild with `flask hashtags refresh-stats`
+    influencer_count = db.Column(db.Integer, default=0, server_default='0', nullable=False, index=True)
+    total_uses = db.Column(db.BigInteger, default=0, server_default='0', nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<Hashtag {self.name}>'
+
+# The trigram operator class comes from the pg_trgm extension
+event.listen(
+    Hashtag.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the writing transaction (see app/etag.py)."""
+    __tablename__ = 'table_versions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, default=0, server_default='0', nullable=False)
 
     def __repr__(self):
-        return f'<Hashtag {self.name}>'
\ No newline at end of file
+        return f'<TableVersion {self.table_name}={self.version}>'
@@ -0,0 +1,43 @@
+# pagination.py
+from flask import request, abort
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def page_args(default_limit=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE):
+    """Read and validate the `after_id` and `limit` keyset pagination arguments."""
+    after_id = request.args.get('after_id', default=0, type=int)
+    limit = request.args.get('limit', default=default_limit, type=int)
+    if limit < 1 or limit > max_limit:
+        abort(400, description=f"limit must be between 1 and {max_limit}.")
+    return after_id, limit
+
+
+def keyset_page(session, stmt, id_column, after_id, limit):
+    """
+    Run one keyset page of `stmt`, ordered by `id_column`.
+
+    Returns the rows and the id to pass as `after_id` for the next page,
+    or None when this is the last page.
+    """
+    rows = session.execute(
+        stmt.where(id_column > after_id).order_by(id_column).limit(limit)
+    ).all()
+    next_after_id = getattr(rows[-1], id_column.key) if len(rows) == limit else None
+    return rows, next_after_id
+
+
+def parse_ids(raw, max_ids=MAX_PAGE_SIZE):
+    """Distinct integer ids in request order, from a list or a comma-separated string."""
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        abort(400, description="ids must be a non-empty list of integers.")
+    try:
+        ids = list(dict.fromkeys(int(i) for i in raw))
+    except (TypeError, ValueError):
+        abort(400, description="ids must be a non-empty list of integers.")
+    if len(ids) > max_ids:
+        abort(400, description=f"At most {max_ids} ids per request.")
+    return ids
@@ -0,0 +1,53 @@
+# patch.py
+from flask import abort
+from sqlalchemy import update
+from sqlalchemy.exc import DataError, IntegrityError
+from app import db
+from app.etag import bump_table_versions
+from app.fields import column_value
+
+
+def patch_row(model, row_id, data, writable, conflict_message):
+    """
+    Set only the supplied columns of one row, in a single UPDATE ... RETURNING.
+
+    Nothing is loaded first: a missing row shows up as an empty RETURNING
+    and becomes a 404. Returns the id and the updated columns as stored.
+
+    Args:
+        model: Mapped class whose table is updated
+        row_id (int): Primary key of the row
+        data (dict): Request body, column name -> new value
+        writable (iterable): Column names the request may set
+        conflict_message (str): 400 description for a constraint violation
+    """
+    if not isinstance(data, dict) or not data:
+        abort(400, description="Request body must be a non-empty object.")
+    unknown = sorted(set(data) - set(writable))
+    if unknown:
+        abort(400, description=f"Unknown or read-only fields: {', '.join(unknown)}")
+    table = model.__table__
+    try:
+        data = {name: column_value(table.c[name], value) for name, value in data.items()}
+    except ValueError as e:
+        abort(400, description=str(e))
+    stmt = (
+        update(table)
+        .where(table.c.id == row_id)
+        .values(data)
+        .returning(table.c.id, *(table.c[name] for name in data))
+    )
+    try:
+        row = db.session.execute(stmt).first()
+        if row is None:
+            db.session.rollback()
+            abort(404)
+        bump_table_versions(db.session, [table.name])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(400, description=conflict_message)
+    except DataError as e:
+        db.session.rollback()
+        abort(400, description=str(e.orig).strip())
+    return row._asdict()
@@ -0,0 +1,108 @@
+# ranking.py
+import time
+import warnings
+import numpy as np
+
+# Relative weight of each signal in the hybrid match score
+DEFAULT_WEIGHTS = {
+    'semantic': 0.7,
+    'engagement': 0.1,
+    'followers': 0.1,
+    'views': 0.05,
+    'recency': 0.05
+}
+
+# Candidate features used besides the semantic score, as float arrays
+FEATURE_FIELDS = ('engagement_rate', 'followers_count', 'average_views', 'most_recent_upload')
+
+
+def timestamps(values):
+    """ISO-8601 strings (or None) to epoch seconds, NaN where missing."""
+    with warnings.catch_warnings():
+        # Timezone offsets are dropped; day-level recency doesn't need them
+        warnings.simplefilter('ignore')
+        dates = np.array(values, dtype='datetime64[s]')
+    seconds = dates.astype(np.float64)
+    seconds[np.isnat(dates)] = np.nan
+    return seconds
+
+
+def metadata_features(metadatas):
+    """Feature arrays for candidates whose metadata is only available as dicts."""
+    features = {
+        field: np.array([np.nan if m.get(field) is None else m[field] for m in metadatas],
+                        dtype=np.float64)
+        for field in FEATURE_FIELDS if field != 'most_recent_upload'
+    }
+    features['most_recent_upload'] = timestamps([m.get('most_recent_upload') for m in metadatas])
+    return features
+
+
+def parse_weights(raw):
+    """Merge request weights over the defaults, rejecting unknown or negative ones."""
+    weights = dict(DEFAULT_WEIGHTS)
+    if not raw:
+        return weights
+    if not isinstance(raw, dict):
+        raise ValueError("ranking_weights must be an object.")
+    for name, value in raw.items():
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown ranking weight: {name}")
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"Ranking weight {name} must be a non-negative number.")
+        weights[name] = value
+    return weights
+
+
+def _unit_scale(values):
+    """Min-max scale to [0, 1] across the candidates; missing values score 0."""
+    if np.isnan(values).all():
+        return np.zeros_like(values)
+    low, high = np.nanmin(values), np.nanmax(values)
+    if high > low:
+        scaled = (values - low) / (high - low)
+    else:
+        scaled = np.ones_like(values)
+    return np.nan_to_num(scaled, nan=0.0)
+
+
+def hybrid_scores(semantic, features, weights, half_life_days=30.0, now=None):
+    """
+    Combine semantic similarity with engagement, reach, views and upload recency.
+
+    Args:
+        semantic (ndarray): Cosine score per candidate
+        features (dict): FEATURE_FIELDS -> float array per candidate
+        weights (dict): Weight per signal, see DEFAULT_WEIGHTS
+        half_life_days (float): Age at which an upload's recency signal halves
+        now (float): Current epoch seconds, for reproducible scoring
+    """
+    now = time.time() if now is None else now
+    age_days = (now - features['most_recent_upload']) / 86400.0
+    signals = {
+        'semantic': np.asarray(semantic, dtype=np.float64),
+        'engagement': features['engagement_rate'],
+        'followers': np.log1p(np.clip(features['followers_count'], 0, None)),
+        'views': np.log1p(np.clip(features['average_views'], 0, None)),
+        'recency': np.exp2(-np.clip(age_days, 0, None) / half_life_days)
+    }
+    total = np.zeros(len(signals['semantic']), dtype=np.float64)
+    for name, weight in weights.items():
+        if weight:
+            total += weight * _unit_scale(signals[name])
+    return total
+
+
+def rerank(matches, features, weights, top_k, half_life_days=30.0, now=None):
+    """Order candidate matches by hybrid score and keep the best top_k."""
+    if not matches:
+        return []
+    semantic = np.fromiter((m['score'] for m in matches), dtype=np.float64, count=len(matches))
+    scores = hybrid_scores(semantic, features, weights, half_life_days, now)
+    k = min(top_k, len(matches))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [
+        {'id': matches[i]['id'], 'score': float(scores[i]), 'metadata': matches[i]['metadata']}
+        for i in top
+    ]
@@ -0,0 +1,116 @@
+# response_cache.py
+import threading
+from functools import wraps
+from flask import current_app, request
+from app.cache import TTLCache
+from app.etag import table_versions
+
+
+class CacheBackend:
+    """
+    Storage for cached responses.
+
+    Values are small tuples of bytes and strings, so a backend can pickle them
+    into an external key-value store. Tags name the route an entry belongs to;
+    `invalidate` drops every entry carrying one of them.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl, tags=()):
+        raise NotImplementedError
+
+    def invalidate(self, tags):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with per-entry expiry; every worker holds its own copy."""
+
+    def __init__(self, maxsize=256):
+        self.cache = TTLCache(maxsize)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl, tags=()):
+        self.cache.set(key, value, tags=tags, ttl=ttl)
+
+    def invalidate(self, tags):
+        self.cache.invalidate_tags(tags)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+BACKENDS = {'memory': MemoryBackend}
+
+
+def create_backend(name, maxsize):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {name}")
+    return BACKENDS[name](maxsize)
+
+
+class ResponseCache:
+    """Caches serialized GET responses per route and URL, with per-route counters."""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config['RESPONSE_CACHE_BACKEND'], app.config['RESPONSE_CACHE_SIZE'])
+
+    def _count(self, route, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(route, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            counts[outcome] += 1
+
+    def cached(self, route, ttl_config, tables):
+        """
+        Serve a GET view from the cache, keyed by `route`, the full request path
+        and the change counters of `tables`.
+
+        Only 200 responses are stored. Entries live for `ttl_config` seconds or
+        until `invalidate(route)` is called. A write in any process bumps the
+        counters, so entries cached before it are never served again.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = f'{route}:{request.full_path}:{table_versions(tables)}'
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count(route, 'hits')
+                    body, mimetype = entry
+                    return current_app.response_class(body, mimetype=mimetype)
+                self._count(route, 'misses')
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, (response.get_data(), response.mimetype),
+                                     current_app.config[ttl_config], tags=(route,))
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *routes):
+        self.backend.invalidate(routes)
+        for route in routes:
+            self._count(route, 'invalidations')
+
+    def stats(self):
+        with self._lock:
+            routes = {}
+            for route, counts in self._counts.items():
+                lookups = counts['hits'] + counts['misses']
+                routes[route] = dict(counts, hit_rate=counts['hits'] / lookups if lookups else 0.0)
+        return {'backend': self.backend.stats(), 'routes': routes}
+
+
+response_cache = ResponseCache()
@@ -1,7 +1,13 @@
 # brands.py
 from flask import Blueprint, request, jsonify, abort
 from app import db
-from app.models import Influencer, Brand
+from app.models import Influencer, Brand, influencer_brand
+from app.pagination import page_args, keyset_page
+from app.etag import conditional
+from app.response_cache import response_cache
+from app.patch import patch_row
+from app.bulk_delete import categorical_filters, delete_brands, lock_ids, parse_selection
+from sqlalchemy import select, func
 from sqlalchemy.exc import IntegrityError
 
 brands_bp = Blueprint('brands', __name__, url_prefix='/brands')
@@ -20,6 +26,7 @@ def create_brand():
         )
         db.session.add(brand)
         db.session.commit()
+        response_cache.invalidate('brands')
         return jsonify({'message': 'Brand created', 'id': brand.id}), 201
     except IntegrityError:
         db.session.rollback()
@@ -27,6 +34,8 @@ def create_brand():
 
 # Read all Brands
 @brands_bp.route('/', methods=['GET'])
+@conditional('brands')
+@response_cache.cached('brands', ttl_config='BRAND_LIST_CACHE_TTL', tables=('brands',))
 def get_brands():
     brands = Brand.query.all()
     return jsonify([{
@@ -40,6 +49,19 @@ def get_brands():
 @brands_bp.route('/<int:brand_id>', methods=['GET'])
 def get_brand(brand_id):
     brand = Brand.query.get_or_404(brand_id)
+    # One page of influencer usernames, by influencer id
+    after_id, limit = page_args()
+    influencers, next_after_id = keyset_page(
+        db.session,
+        select(Influencer.id, Influencer.username)
+        .join(influencer_brand, influencer_brand.c.influencer_id == Influencer.id)
+        .where(influencer_brand.c.brand_id == brand_id),
+        Influencer.id, after_id, limit
+    )
+    influencer_count = db.session.execute(
+        select(func.count()).select_from(influencer_brand)
+        .where(influencer_brand.c.brand_id == brand_id)
+    ).scalar()
     return jsonify({
         'id': brand.id,
         'name': brand.name,
@@ -47,7 +69,9 @@ def get_brand(brand_id):
         'website': brand.website,
         'description': brand.description,
         'contact_email': brand.contact_email,
-        'influencers': [inf.username for inf in brand.influencers]
+        'influencers': [inf.username for inf in influencers],
+        'influencer_count': influencer_count,
+        'next_after_id': next_after_id
     })
 
 # Update a Brand
@@ -62,19 +86,50 @@ def update_brand(brand_id):
         brand.description = data.get('description', brand.description)
         brand.contact_email = data.get('contact_email', brand.contact_email)
         db.session.commit()
+        response_cache.invalidate('brands')
         return jsonify({'message': 'Brand updated'})
     except IntegrityError:
         db.session.rollback()
         abort(400, description="Brand name must be unique.")
 
+# Set some fields of a Brand with one UPDATE, without loading the row
+@brands_bp.route('/<int:brand_id>', methods=['PATCH'])
+def patch_brand(brand_id):
+    row = patch_row(
+        Brand, brand_id, request.get_json(),
+        ('name', 'industry', 'website', 'description', 'contact_email'), "Brand name must be unique."
+    )
+    response_cache.invalidate('brands')
+    return jsonify(row)
+
+def remove_brands(ids=None, filters=None):
+    """
+    Delete the matching brands in one transaction.
+
+    Returns the deleted ids and whether more rows match the filters.
+    """
+    deleted, more = lock_ids(db.session, Brand, ids=ids, filters=filters)
+    delete_brands(db.session, deleted)
+    db.session.commit()
+    if deleted:
+        response_cache.invalidate('brands')
+    return deleted, more
+
 # Delete a Brand
 @brands_bp.route('/<int:brand_id>', methods=['DELETE'])
 def delete_brand(brand_id):
-    brand = Brand.query.get_or_404(brand_id)
-    db.session.delete(brand)
-    db.session.commit()
+    deleted, _ = remove_brands(ids=[brand_id])
+    if not deleted:
+        abort(404)
     return jsonify({'message': 'Brand deleted'})
 
+# Delete Brands by id list or industry, with their influencer associations
+@brands_bp.route('/bulk/delete', methods=['POST'])
+def delete_brands_bulk():
+    ids, filters = parse_selection(request.get_json(), categorical_filters(('industry',)))
+    deleted, more = remove_brands(ids=ids, filters=filters)
+    return jsonify({'deleted': len(deleted), 'ids': deleted, 'more': more})
+
 # Add an Influencer to a Brand
 @brands_bp.route('/<int:brand_id>/influencers', methods=['POST'])
 def add_influencer_to_brand(brand_id):
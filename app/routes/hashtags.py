@@ -2,13 +2,22 @@
 from flask import Blueprint, request, jsonify, abort
 from app import db
 from app.models import Influencer, Hashtag, influencer_hashtag
+from app.pagination import MAX_PAGE_SIZE, page_args, keyset_page
+from app.hashtag_index import hashtag_prefix_index
+from app.etag import conditional
+from app.response_cache import response_cache
+from app.patch import patch_row
+from app.bulk_delete import categorical_filters, delete_hashtags, lock_ids, parse_selection
+from app.hashtag_stats import association_usage, apply_hashtag_deltas, record_hashtag_usage
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import desc
+from sqlalchemy import desc, select
 
 hashtags_bp = Blueprint('hashtags', __name__, url_prefix='/hashtags')
 
 # Read all Hashtags
 @hashtags_bp.route('/', methods=['GET'])
+@conditional('hashtags')
+@response_cache.cached('hashtags', ttl_config='HASHTAG_LIST_CACHE_TTL', tables=('hashtags',))
 def get_hashtags():
     hashtags = Hashtag.query.all()
     return jsonify([{
@@ -47,26 +56,32 @@ def get_influencers_for_hashtag(hashtag_id):
     return jsonify([{
         'id': inf.id,
         'username': inf.username,
-        'follower_count': inf.follower_count,
+        'follower_count': inf.followers_count,
         'engagement_rate': inf.engagement_rate,
         'usage_count': count  # How many times they used this hashtag
     } for inf, count in influencers])
 
+# Complete a hashtag prefix, most used first
+@hashtags_bp.route('/autocomplete', methods=['GET'])
+def autocomplete_hashtags():
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', default=10, type=int)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    if not prefix:
+        return jsonify([])
+    return jsonify(hashtag_prefix_index.complete(prefix, limit))
+
 @hashtags_bp.route('/search', methods=['GET'])
 def search_hashtags():
     query = request.args.get('q', '')
     limit = request.args.get('limit', default=10, type=int)
     
+    # Rank on the stored aggregates instead of grouping influencer_hashtag per request
     hashtags = (
-        db.session.query(
-            Hashtag,
-            db.func.count(influencer_hashtag.c.influencer_id).label('influencer_count'),
-            db.func.sum(influencer_hashtag.c.usage_count).label('total_uses')
-        )
-        .join(influencer_hashtag)
-        .filter(Hashtag.name.ilike(f'%{query}%'))
-        .group_by(Hashtag.id)
-        .order_by(desc('total_uses'))
+        Hashtag.query
+        .filter(Hashtag.name.ilike(f'%{query}%'), Hashtag.influencer_count > 0)
+        .order_by(desc(Hashtag.total_uses))
         .limit(limit)
         .all()
     )
@@ -75,9 +90,9 @@ def search_hashtags():
         'id': tag.id,
         'name': tag.name,
         'topic': tag.topic,
-        'influencer_count': inf_count,  # How many influencers use this
-        'total_uses': total_uses       # Total times used across all influencers
-    } for tag, inf_count, total_uses in hashtags])
+        'influencer_count': tag.influencer_count,  # How many influencers use this
+        'total_uses': tag.total_uses       # Total times used across all influencers
+    } for tag in hashtags])
 
 # Create a Hashtag
 @hashtags_bp.route('/', methods=['POST'])
@@ -91,6 +106,8 @@ def create_hashtag():
         )
         db.session.add(hashtag)
         db.session.commit()
+        hashtag_prefix_index.invalidate()
+        response_cache.invalidate('hashtags')
         return jsonify({'message': 'Hashtag created', 'id': hashtag.id}), 201
     except IntegrityError as e:
         db.session.rollback()
@@ -102,12 +119,23 @@ def create_hashtag():
 @hashtags_bp.route('/<int:hashtag_id>', methods=['GET'])
 def get_hashtag(hashtag_id):
     hashtag = Hashtag.query.get_or_404(hashtag_id)
+    # One page of influencer usernames, by influencer id
+    after_id, limit = page_args()
+    influencers, next_after_id = keyset_page(
+        db.session,
+        select(Influencer.id, Influencer.username)
+        .join(influencer_hashtag, influencer_hashtag.c.influencer_id == Influencer.id)
+        .where(influencer_hashtag.c.hashtag_id == hashtag_id),
+        Influencer.id, after_id, limit
+    )
     return jsonify({
         'id': hashtag.id,
         'name': hashtag.name,
         'topic': hashtag.topic,
         'description': hashtag.description,
-        'influencers': [inf.username for inf in hashtag.influencers]
+        'influencers': [inf.username for inf in influencers],
+        'influencer_count': hashtag.influencer_count,
+        'next_after_id': next_after_id
     })
 
 # Update a Hashtag
@@ -116,23 +144,61 @@ def update_hashtag(hashtag_id):
     hashtag = Hashtag.query.get_or_404(hashtag_id)
     data = request.get_json()
     try:
+        renamed = data.get('name', hashtag.name) != hashtag.name
         hashtag.name = data.get('name', hashtag.name)
         hashtag.topic = data.get('topic', hashtag.topic)
         hashtag.description = data.get('description', hashtag.description)
         db.session.commit()
+        if renamed:
+            hashtag_prefix_index.invalidate()
+        response_cache.invalidate('hashtags')
         return jsonify({'message': 'Hashtag updated'})
     except IntegrityError:
         db.session.rollback()
         abort(400, description="Hashtag name must be unique.")
 
+# Set some fields of a Hashtag with one UPDATE, without loading the row
+@hashtags_bp.route('/<int:hashtag_id>', methods=['PATCH'])
+def patch_hashtag(hashtag_id):
+    # influencer_count and total_uses are maintained from influencer_hashtag
+    row = patch_row(
+        Hashtag, hashtag_id, request.get_json(),
+        ('name', 'topic', 'description'), "Hashtag name must be unique."
+    )
+    if 'name' in row:
+        hashtag_prefix_index.invalidate()
+    response_cache.invalidate('hashtags')
+    return jsonify(row)
+
+def remove_hashtags(ids=None, filters=None):
+    """
+    Delete the matching hashtags in one transaction.
+
+    Returns the deleted ids and whether more rows match the filters.
+    """
+    deleted, more = lock_ids(db.session, Hashtag, ids=ids, filters=filters)
+    delete_hashtags(db.session, deleted)
+    db.session.commit()
+    if deleted:
+        hashtag_prefix_index.invalidate()
+        response_cache.invalidate('hashtags')
+    return deleted, more
+
 # Delete a Hashtag
 @hashtags_bp.route('/<int:hashtag_id>', methods=['DELETE'])
 def delete_hashtag(hashtag_id):
-    hashtag = Hashtag.query.get_or_404(hashtag_id)
-    db.session.delete(hashtag)
-    db.session.commit()
+    deleted, _ = remove_hashtags(ids=[hashtag_id])
+    if not deleted:
+        abort(404)
     return jsonify({'message': 'Hashtag deleted'})
 
+# Delete Hashtags by id list or topic, with their influencer associations
+@hashtags_bp.route('/bulk/delete', methods=['POST'])
+def delete_hashtags_bulk():
+    ids, filters = parse_selection(request.get_json(), categorical_filters(('topic',)))
+    deleted, more = remove_hashtags(ids=ids, filters=filters)
+    return jsonify({'deleted': len(deleted), 'ids': deleted, 'more': more})
+
 # Add an Influencer to a Hashtag
 @hashtags_bp.route('/<int:hashtag_id>/influencers', methods=['POST'])
 def add_influencer_to_hashtag(hashtag_id):
@@ -142,8 +208,10 @@ def add_influencer_to_hashtag(hashtag_id):
     if not influencer_id:
         abort(400, description="influencer_id is required.")
     influencer = Influencer.query.get_or_404(influencer_id)
-    hashtag.influencers.append(influencer)
-    db.session.commit()
+    if association_usage(influencer.id, hashtag.id) is None:
+        hashtag.influencers.append(influencer)
+        apply_hashtag_deltas(db.session, {hashtag.id: (1, 1)})
+        db.session.commit()
     return jsonify({'message': f'Influencer {influencer.username} added to Hashtag {hashtag.name}.'})
 
 # Remove an Influencer from a Hashtag
@@ -151,9 +219,59 @@ def add_influencer_to_hashtag(hashtag_id):
 def remove_influencer_from_hashtag(hashtag_id, influencer_id):
     hashtag = Hashtag.query.get_or_404(hashtag_id)
     influencer = Influencer.query.get_or_404(influencer_id)
-    if influencer in hashtag.influencers:
+    usage_count = association_usage(influencer_id, hashtag_id)
+    if usage_count is not None:
         hashtag.influencers.remove(influencer)
+        apply_hashtag_deltas(db.session, {hashtag_id: (-1, -usage_count)})
         db.session.commit()
         return jsonify({'message': f'Influencer {influencer.username} removed from Hashtag {hashtag.name}.'})
     else:
-        abort(404, description="Influencer not associated with this Hashtag.")
\ No newline at end of file
+        abort(404, description="Influencer not associated with this Hashtag.")
+
+MAX_ASSOCIATIONS = 50000
+
+def parse_associations(raw):
+    """
+    Summed usage per (influencer_id, hashtag_id) from a list of
+    [influencer_id, hashtag_id, usage_delta] triples or objects with those keys.
+    """
+    if not isinstance(raw, list) or not raw:
+        abort(400, description="associations must be a non-empty list.")
+    if len(raw) > MAX_ASSOCIATIONS:
+        abort(400, description=f"At most {MAX_ASSOCIATIONS} associations per request.")
+    usage = {}
+    for item in raw:
+        try:
+            if isinstance(item, dict):
+                item = (item['influencer_id'], item['hashtag_id'], item.get('usage_delta', 1))
+            influencer_id, hashtag_id, delta = (int(value) for value in item)
+        except (KeyError, TypeError, ValueError):
+            abort(400, description="Each association needs integer influencer_id, hashtag_id and usage_delta.")
+        if delta < 1:
+            abort(400, description="usage_delta must be positive.")
+        usage[(influencer_id, hashtag_id)] = usage.get((influencer_id, hashtag_id), 0) + delta
+    return usage
+
+def missing_ids(column, ids):
+    found = set(db.session.execute(select(column).where(column.in_(ids))).scalars())
+    return sorted(set(ids) - found)
+
+# Add usage to many Influencer-Hashtag associations at once
+@hashtags_bp.route('/associations', methods=['POST'])
+def record_associations():
+    data = request.get_json()
+    usage = parse_associations(data.get('associations') if isinstance(data, dict) else data)
+    unknown_influencers = missing_ids(Influencer.id, {pair[0] for pair in usage})
+    if unknown_influencers:
+        abort(400, description=f"Unknown influencer ids: {unknown_influencers}")
+    unknown_hashtags = missing_ids(Hashtag.id, {pair[1] for pair in usage})
+    if unknown_hashtags:
+        abort(400, description=f"Unknown hashtag ids: {unknown_hashtags}")
+    created = record_hashtag_usage(db.session, usage)
+    db.session.commit()
+    # Usage counts only reorder completions; the prefix index picks them up within HASHTAG_INDEX_TTL
+    return jsonify({
+        'associations': len(usage),
+        'created': created,
+        'updated': len(usage) - created
+    })
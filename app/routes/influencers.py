@@ -1,44 +1,30 @@
 # influencers.py
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, Response, current_app, request, jsonify, abort, stream_with_context
 from app import db
-from app.models import Influencer, Brand, Hashtag
-from sqlalchemy.exc import IntegrityError
-import os
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-import warnings
-
-warnings.filterwarnings('ignore')
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-
-index_name = "experiment"
-
-# connect to index
-index = pc.Index(index_name)
-
-# view index stats
-print("Index stats:",index.describe_index_stats())
-
-def retrieve_from_pinecone(user_query, num_results=20):
-    ## Pinecone context code:
-    results=index.query(
-    vector=model.encode(user_query).tolist(),
-    # filter={
-    #     "genre": {"$eq": "documentary"}
-    # },
-    top_k=num_results,
-    include_metadata=True # Include metadata in the response.
-    )
-    return results
-
-# matches=retrieve_from_pinecone('I am selling a new nutritional supplement')
-# print(matches)
+from app.models import Influencer, Brand, Hashtag, influencer_hashtag, geo_location
+from app.pagination import MAX_PAGE_SIZE, page_args, keyset_page, parse_ids
+from app.fields import column_names, requested_fields, field_columns
+from app.sampling import influencer_ids
+from app.etag import conditional
+from app.influencer_upsert import UPSERT_COLUMNS, upsert_influencers
+from app.patch import patch_row
+from app.write_behind import MAX_INTEGER, METRIC_COLUMNS, metric_value, metric_writes, update_metrics
+from app.hashtag_stats import association_usage, apply_hashtag_deltas
+from app.bulk_delete import delete_influencers, lock_ids, parse_selection
+from sqlalchemy import select, func
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.exc import DataError, IntegrityError
+from app.matching import (
+    retrieve_from_index, retrieve_many_from_index, parse_filters, parse_query, parse_influencer_count,
+    query_embedding_cache, match_result_cache, match_cache_key, invalidate_match_results, status as match_status
+)
+from app.ranking import parse_weights
+from random import randint
 
 influencers_bp = Blueprint('influencers', __name__, url_prefix='/influencers')
 
+STREAM_BATCH_SIZE = 1000
+
 # Create an Influencer
 @influencers_bp.route('/', methods=['POST'])
 def create_influencer():
@@ -75,46 +61,46 @@ def create_influencer():
         db.session.rollback()
         abort(400, description="Username must be unique.")
 
-from random import randint, sample
 # Get random influencers with matching score
 @influencers_bp.route('/random', methods=['GET'])
 def get_random_influencers():
-    # Get influencer count from query params, default to 200
     influencer_count = request.args.get('influencer_count', default=10, type=int)
-    # Get all influencers
-    influencers = Influencer.query.all()
-    # Select random influencers if we have more than requested count
-    if len(influencers) > influencer_count:
-        influencers = sample(influencers, influencer_count)
+    if influencer_count < 1 or influencer_count > MAX_PAGE_SIZE:
+        abort(400, description=f"influencer_count must be between 1 and {MAX_PAGE_SIZE}.")
+    # Over-sample a little so ids deleted since the cache refresh don't shrink the result
+    ids = influencer_ids.sample(influencer_count + max(5, influencer_count // 10))
+    rows = db.session.execute(
+        select(
+            Influencer.id, Influencer.username, Influencer.followers_count,
+            Influencer.youtube_link, Influencer.instagram_link,
+            Influencer.creator_city, Influencer.creator_state, Influencer.creator_country
+        ).where(Influencer.id.in_(ids))
+    ).all()
+    rows_by_id = {row.id: row for row in rows}
+    rows = [rows_by_id[i] for i in ids if i in rows_by_id][:influencer_count]
     results = []
-    for inf in influencers:
+    for row in rows:
         # Determine platforms
         platforms = ['TikTok']  # TikTok is assumed as base platform
-        if inf.youtube_channel:
+        if row.youtube_link:
             platforms.append('YouTube')
-        if inf.contact_instagram:
+        if row.instagram_link:
             platforms.append('Instagram')
-            
+
         results.append({
-            'id': inf.id,
-            'username': inf.username,
-            'followers_count': inf.followers_count,
+            'id': row.id,
+            'username': row.username,
+            'followers_count': row.followers_count,
             'platforms': platforms,
-            'geo_location': inf.geo_location,
+            'geo_location': geo_location(row.creator_city, row.creator_state, row.creator_country),
             'matching_score': randint(1, 100)
         })
     
     return jsonify(results)
 
-# Retrieve influencers with matching scores
-@influencers_bp.route('/match', methods=['POST'])
-def retrieve_matches():
-    # Get request data from the JSON body
-    request_data = request.get_json()
-    user_query = request_data.get('user_query')
-    influencer_count = request_data.get('influencer_count', 10)
-    # Assuming `retrieve_from_pinecone` function works and is already imported
-    results = retrieve_from_pinecone(user_query, influencer_count)
+def format_matches(results):
+    if not results['matches']:
+        return []
     # Extract all scores for scaling
     all_scores = [match['score'] for match in results['matches']]
     min_score = min(all_scores)
@@ -142,50 +128,246 @@ def retrieve_matches():
             "geo_location": match['metadata']['geolocation'],
             "username": match['metadata']['username']
         })
-    
+    return formatted_results
+
+# Retrieve influencers with matching scores
+@influencers_bp.route('/match', methods=['POST'])
+def retrieve_matches():
+    # Get request data from the JSON body
+    request_data = request.get_json()
+    if not isinstance(request_data, dict):
+        abort(400, description="Request body must be an object.")
+    try:
+        user_query = parse_query(request_data.get('user_query'))
+        influencer_count = parse_influencer_count(request_data.get('influencer_count', 10), MAX_PAGE_SIZE)
+        filters = parse_filters(request_data.get('filters'))
+        weights = parse_weights(request_data.get('ranking_weights'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    key = match_cache_key(user_query, influencer_count, filters, weights)
+    formatted_results = match_result_cache.get(key)
+    if formatted_results is None:
+        results = retrieve_from_index(user_query, influencer_count, filters, weights)
+        formatted_results = format_matches(results)
+        match_result_cache.set(key, formatted_results, tags=[r['id'] for r in formatted_results])
     return jsonify(formatted_results)
 
-# Read all Influencers
+MAX_BATCH_QUERIES = 100
+
+# Retrieve matches for several queries in one call
+@influencers_bp.route('/match/batch', methods=['POST'])
+def retrieve_matches_batch():
+    request_data = request.get_json()
+    if not isinstance(request_data, dict):
+        abort(400, description="Request body must be an object.")
+    user_queries = request_data.get('queries')
+    if not user_queries or not isinstance(user_queries, list):
+        abort(400, description="queries must be a non-empty list.")
+    if len(user_queries) > MAX_BATCH_QUERIES:
+        abort(400, description=f"At most {MAX_BATCH_QUERIES} queries per batch.")
+    try:
+        user_queries = [parse_query(q, 'Each query') for q in user_queries]
+        influencer_count = parse_influencer_count(request_data.get('influencer_count', 10), MAX_PAGE_SIZE)
+        filters = parse_filters(request_data.get('filters'))
+        weights = parse_weights(request_data.get('ranking_weights'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    keys = [match_cache_key(q, influencer_count, filters, weights) for q in user_queries]
+    cached = {key: match_result_cache.get(key) for key in set(keys)}
+    missing = [key for key in cached if cached[key] is None]
+    if missing:
+        queries_by_key = dict(zip(keys, user_queries))
+        results = retrieve_many_from_index(
+            [queries_by_key[key] for key in missing], influencer_count, filters, weights
+        )
+        for key, result in zip(missing, results):
+            cached[key] = format_matches(result)
+            match_result_cache.set(key, cached[key], tags=[r['id'] for r in cached[key]])
+    return jsonify([cached[key] for key in keys])
+
+# Cache statistics for /match
+@influencers_bp.route('/match/stats', methods=['GET'])
+def get_match_stats():
+    return jsonify({
+        'query_embedding_cache': query_embedding_cache.stats(),
+        'match_result_cache': match_result_cache.stats()
+    })
+
+# Readiness of the embedding model and vector index
+@influencers_bp.route('/match/ready', methods=['GET'])
+def get_match_readiness():
+    state = match_status()
+    return jsonify(state), 200 if state['ready'] else 503
+
+LIST_FIELDS = ('id', 'username', 'followers_count')
+
+# Read Influencers, one keyset page at a time or streamed
 @influencers_bp.route('/', methods=['GET'])
 def get_influencers():
-    influencers = Influencer.query.all()
-    return jsonify([{
-        'id': inf.id,
-        'username': inf.username,
-        'followers_count': inf.followers_count,
-    } for inf in influencers])
+    after_id, limit = page_args()
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+    # Select only the requested columns; rows never become ORM objects
+    fields = requested_fields(Influencer, LIST_FIELDS)
+    stmt = select(*field_columns(Influencer, fields))
+
+    if stream:
+        # Every influencer after after_id, encoded as the server-side cursor yields rows
+        def generate():
+            dumps = current_app.json.dumps
+            yield '['
+            first = True
+            rows = db.session.execute(
+                stmt.where(Influencer.id > after_id)
+                .order_by(Influencer.id)
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            for batch in rows.partitions():
+                chunk = ','.join(dumps(row._asdict()) for row in batch)
+                yield chunk if first else ',' + chunk
+                first = False
+            yield ']'
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+    rows, next_after_id = keyset_page(db.session, stmt, Influencer.id, after_id, limit)
+    response = jsonify([row._asdict() for row in rows])
+    if next_after_id is not None:
+        # Pass back as after_id to fetch the next page
+        response.headers['X-Next-After-Id'] = str(next_after_id)
+    return response
 
 # Read a single Influencer
 @influencers_bp.route('/<int:influencer_id>', methods=['GET'])
+@conditional('influencers', 'influencer_hashtag', 'hashtags')
 def get_influencer(influencer_id):
-    influencer = Influencer.query.get_or_404(influencer_id)
+    fields = requested_fields(Influencer, column_names(Influencer) + ['hashtags'], extra=('hashtags',))
+    row = db.session.execute(
+        select(*field_columns(Influencer, fields)).where(Influencer.id == influencer_id)
+    ).first()
+    if row is None:
+        abort(404)
+    influencer = row._asdict()
+    if 'hashtags' in fields:
+        # One page of hashtag names, by hashtag id
+        after_id, limit = page_args()
+        hashtags, next_after_id = keyset_page(
+            db.session,
+            select(Hashtag.id, Hashtag.name)
+            .join(influencer_hashtag, influencer_hashtag.c.hashtag_id == Hashtag.id)
+            .where(influencer_hashtag.c.influencer_id == influencer_id),
+            Hashtag.id, after_id, limit
+        )
+        influencer['hashtags'] = [hashtag.name for hashtag in hashtags]
+        influencer['hashtag_count'] = db.session.execute(
+            select(func.count()).select_from(influencer_hashtag)
+            .where(influencer_hashtag.c.influencer_id == influencer_id)
+        ).scalar()
+        influencer['next_after_id'] = next_after_id
+    return jsonify(influencer)
+
+def fetch_influencers(ids):
+    # One IN query for the rows and one selectinload query for all their hashtags
+    fields = requested_fields(Influencer, column_names(Influencer) + ['hashtags'], extra=('hashtags',))
+    query = Influencer.query.options(load_only(*field_columns(Influencer, fields)))
+    if 'hashtags' in fields:
+        query = query.options(selectinload(Influencer.hashtags).load_only(Hashtag.name))
+    influencers = {inf.id: inf for inf in query.filter(Influencer.id.in_(ids))}
+    results = []
+    for influencer_id in ids:
+        influencer = influencers.get(influencer_id)
+        if influencer is None:
+            continue
+        result = {name: getattr(influencer, name) for name in fields if name != 'hashtags'}
+        if 'hashtags' in fields:
+            result['hashtags'] = [hashtag.name for hashtag in influencer.hashtags]
+        results.append(result)
+    return jsonify(results)
+
+# Read several Influencers by id, in the order requested
+@influencers_bp.route('/bulk', methods=['GET'])
+def get_influencers_bulk():
+    return fetch_influencers(parse_ids(request.args.get('ids', '')))
+
+# Same as GET /bulk, for id lists too long for a query string
+@influencers_bp.route('/bulk/fetch', methods=['POST'])
+def fetch_influencers_bulk():
+    data = request.get_json()
+    return fetch_influencers(parse_ids(data.get('ids') if isinstance(data, dict) else None))
+
+MAX_UPSERT_RECORDS = 10000
+
+# Create or update many Influencers by username
+@influencers_bp.route('/bulk', methods=['POST'])
+def upsert_influencers_bulk():
+    data = request.get_json()
+    records = data.get('influencers') if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        abort(400, description="influencers must be a non-empty list.")
+    if len(records) > MAX_UPSERT_RECORDS:
+        abort(400, description=f"At most {MAX_UPSERT_RECORDS} influencers per request.")
+
+    results = upsert_influencers(db.session, records, current_app.config['BULK_UPSERT_CHUNK_SIZE'])
+
+    counts = {'created': 0, 'updated': 0, 'error': 0}
+    for result in results:
+        counts[result['status']] += 1
+    updated_ids = {result['id'] for result in results if result['status'] == 'updated'}
+    if updated_ids:
+        invalidate_match_results(updated_ids)
+    if counts['created']:
+        influencer_ids.invalidate()
     return jsonify({
-        'id': influencer.id,
-        'username': influencer.username,
-        'full_name': influencer.full_name,
-        'profile_link': influencer.profile_link,
-        'bio': influencer.bio,
-        'creator_gender': influencer.creator_gender,
-        'creator_city': influencer.creator_city,
-        'creator_state': influencer.creator_state,
-        'creator_country': influencer.creator_country,
-        'followers_count': influencer.followers_count,
-        'average_likes': influencer.average_likes,
-        'average_views': influencer.average_views,
-        'engagement_rate': influencer.engagement_rate,
-        'email': influencer.email,
-        'instagram_link': influencer.instagram_link,
-        'youtube_link': influencer.youtube_link,
-        'video_desc': influencer.video_desc,
-        'video_count': influencer.video_count,
-        'view_counts': influencer.view_counts,
-        'most_view_count': influencer.most_view_count,
-        'most_recent_upload': influencer.most_recent_upload,
-        'verified': influencer.verified,
-        'audience_desc': influencer.audience_desc,
-        'hashtags': [hashtag.name for hashtag in influencer.hashtags],
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'errors': counts['error'],
+        'results': results
     })
 
+def parse_metric_updates(raw):
+    """{influencer id: {metric: value}} from a list of objects with an id and metric columns."""
+    if not isinstance(raw, list) or not raw:
+        abort(400, description="updates must be a non-empty list.")
+    if len(raw) > MAX_UPSERT_RECORDS:
+        abort(400, description=f"At most {MAX_UPSERT_RECORDS} updates per request.")
+    updates = {}
+    for item in raw:
+        if (not isinstance(item, dict) or not isinstance(item.get('id'), int)
+                or isinstance(item['id'], bool) or not 0 < item['id'] <= MAX_INTEGER):
+            abort(400, description="Each update needs a positive integer id.")
+        metrics = {name: value for name, value in item.items() if name != 'id'}
+        unknown = sorted(set(metrics) - set(METRIC_COLUMNS))
+        if unknown or not metrics:
+            abort(400, description=f"Updates may only set {', '.join(METRIC_COLUMNS)}.")
+        try:
+            # Checked here, since a value the database rejects would fail its whole flush
+            metrics = {name: metric_value(name, value) for name, value in metrics.items()}
+        except ValueError as e:
+            abort(400, description=str(e))
+        # Later updates for the same influencer win
+        updates.setdefault(item['id'], {}).update(metrics)
+    return updates
+
+# Push follower, view and engagement metrics; queued when METRIC_WRITE_BEHIND is on
+@influencers_bp.route('/metrics', methods=['POST'])
+def push_metrics():
+    data = request.get_json()
+    updates = parse_metric_updates(data.get('updates') if isinstance(data, dict) else data)
+    if current_app.config['METRIC_WRITE_BEHIND']:
+        if not metric_writes.enqueue(updates):
+            abort(503, description="Metric queue is full, retry later.")
+        return jsonify({'queued': len(updates)}), 202
+    try:
+        update_metrics(db.session, updates)
+        db.session.commit()
+    except DataError as e:
+        db.session.rollback()
+        abort(400, description=str(e.orig).strip())
+    invalidate_match_results(updates)
+    return jsonify({'updated': len(updates)})
+
+@influencers_bp.route('/metrics/stats', methods=['GET'])
+def get_metric_stats():
+    return jsonify(metric_writes.stats())
+
 # Update an Influencer
 @influencers_bp.route('/<int:influencer_id>', methods=['PUT'])
 def update_influencer(influencer_id):
@@ -215,20 +397,53 @@ def update_influencer(influencer_id):
         influencer.verified = data.get('verified', influencer.verified)
         influencer.audience_desc = data.get('audience_desc', influencer.audience_desc)
         db.session.commit()
+        invalidate_match_results([influencer_id])
         return jsonify({'message': 'Influencer updated'})
 
     except IntegrityError:
         db.session.rollback()
         abort(400, description="Username must be unique.")
 
+# Set some fields of an Influencer with one UPDATE, without loading the row
+@influencers_bp.route('/<int:influencer_id>', methods=['PATCH'])
+def patch_influencer(influencer_id):
+    row = patch_row(
+        Influencer, influencer_id, request.get_json(),
+        UPSERT_COLUMNS, "Username must be unique."
+    )
+    invalidate_match_results([influencer_id])
+    return jsonify(row)
+
+def remove_influencers(ids=None, filters=None):
+    """
+    Delete the matching influencers in one transaction.
+
+    Returns the deleted ids and whether more rows match the filters.
+    """
+    deleted, more = lock_ids(db.session, Influencer, ids=ids, filters=filters)
+    delete_influencers(db.session, deleted)
+    db.session.commit()
+    if deleted:
+        invalidate_match_results(deleted)
+        influencer_ids.invalidate()
+    return deleted, more
+
 # Delete an Influencer
 @influencers_bp.route('/<int:influencer_id>', methods=['DELETE'])
 def delete_influencer(influencer_id):
-    influencer = Influencer.query.get_or_404(influencer_id)
-    db.session.delete(influencer)
-    db.session.commit()
+    deleted, _ = remove_influencers(ids=[influencer_id])
+    if not deleted:
+        abort(404)
     return jsonify({'message': 'Influencer deleted'})
 
+# Delete Influencers by id list or filters, with their brand and hashtag associations
+@influencers_bp.route('/bulk/delete', methods=['POST'])
+def delete_influencers_bulk():
+    ids, filters = parse_selection(request.get_json(), parse_filters)
+    deleted, more = remove_influencers(ids=ids, filters=filters)
+    # With more=true, repeat the request to delete the next batch
+    return jsonify({'deleted': len(deleted), 'ids': deleted, 'more': more})
+
 # Add a Brand to an Influencer
 @influencers_bp.route('/<int:influencer_id>/brands', methods=['POST'])
 def add_brand_to_influencer(influencer_id):
@@ -263,8 +478,10 @@ def add_hashtag_to_influencer(influencer_id):
     if not hashtag_id:
         abort(400, description="hashtag_id is required.")
     hashtag = Hashtag.query.get_or_404(hashtag_id)
-    influencer.hashtags.append(hashtag)
-    db.session.commit()
+    if association_usage(influencer.id, hashtag.id) is None:
+        influencer.hashtags.append(hashtag)
+        apply_hashtag_deltas(db.session, {hashtag.id: (1, 1)})
+        db.session.commit()
     return jsonify({'message': f'Hashtag {hashtag.name} added to Influencer {influencer.username}.'})
 
 # Remove a Hashtag from an Influencer
@@ -272,8 +489,10 @@ def add_hashtag_to_influencer(influencer_id):
 def remove_hashtag_from_influencer(influencer_id, hashtag_id):
     influencer = Influencer.query.get_or_404(influencer_id)
     hashtag = Hashtag.query.get_or_404(hashtag_id)
-    if hashtag in influencer.hashtags:
+    usage_count = association_usage(influencer_id, hashtag_id)
+    if usage_count is not None:
         influencer.hashtags.remove(hashtag)
+        apply_hashtag_deltas(db.session, {hashtag_id: (-1, -usage_count)})
         db.session.commit()
         return jsonify({'message': f'Hashtag {hashtag.name} removed from Influencer {influencer.username}.'})
     else:
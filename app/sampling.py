@@ -0,0 +1,35 @@
+# sampling.py
+import random
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Influencer
+from app.snapshot import BackgroundSnapshot
+
+
+class IdSampler(BackgroundSnapshot):
+    """Uniform random influencer ids drawn from a cached, sorted id array.
+
+    A request only pays for the k picks; the array itself is reloaded in the
+    background every RANDOM_SAMPLE_ID_TTL seconds.
+    """
+
+    ttl_config = 'RANDOM_SAMPLE_ID_TTL'
+
+    def __init__(self, column):
+        super().__init__()
+        self.column = column
+
+    def load(self):
+        ids = db.session.execute(select(self.column).order_by(self.column)).scalars()
+        return np.fromiter(ids, dtype=np.int64)
+
+    def sample(self, k):
+        """Up to k distinct ids, picked in O(k) from the cached array."""
+        ids = self.current()
+        if k >= len(ids):
+            return ids.tolist()
+        return ids[random.sample(range(len(ids)), k)].tolist()
+
+
+influencer_ids = IdSampler(Influencer.id)
@@ -0,0 +1,58 @@
+# snapshot.py
+import logging
+import threading
+import time
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundSnapshot:
+    """Data loaded from the database on first use and kept in memory.
+
+    Once the snapshot is older than the `ttl_config` setting (seconds) it is
+    reloaded in a background thread while requests keep using the old copy.
+    """
+
+    ttl_config = None
+
+    def __init__(self):
+        self.data = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load(self):
+        """Build the snapshot; runs inside an app context."""
+        raise NotImplementedError
+
+    def _store(self):
+        self.data = self.load()
+        self.loaded_at = time.monotonic()
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self._store()
+        except Exception as e:
+            logger.error(f"Refreshing {type(self).__name__} failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def current(self):
+        if self.data is None:
+            with self._lock:
+                if self.data is None:
+                    self._store()
+        elif time.monotonic() - self.loaded_at > current_app.config[self.ttl_config]:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(
+                        target=self._refresh, args=(current_app._get_current_object(),), daemon=True
+                    ).start()
+        return self.data
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next request starts a background reload."""
+        self.loaded_at = 0.0
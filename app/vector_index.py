@@ -0,0 +1,404 @@
+# vector_index.py
+import json
+import os
+import shutil
+import numpy as np
+from app.cache import LRUCache
+from app.ranking import FEATURE_FIELDS, metadata_features, timestamps
+
+# Metadata fields /match can filter on. Categorical filters hold a tuple of
+# accepted values, range filters a (min, max) pair where either end may be None.
+CATEGORICAL_FILTERS = ('creator_country', 'creator_gender', 'verified')
+RANGE_FILTERS = ('followers_count', 'engagement_rate')
+# Fields stored as float64 columns (NaN when missing) for range filters and re-ranking
+NUMERIC_COLUMNS = tuple(dict.fromkeys(RANGE_FILTERS + FEATURE_FIELDS))
+
+# Bytes of the float32 (queries x rows) score matrix computed at once by query_many
+SCORE_MEMORY_BYTES = 64 * 2**20
+
+
+class VectorIndex:
+    """Common interface for the vector search backends behind /match.
+
+    Backends return results shaped like a Pinecone query response:
+    {'matches': [{'id': str, 'score': float, 'metadata': dict}, ...]}
+    """
+
+    def query(self, vector, top_k=20, include_metadata=True, filter=None):
+        raise NotImplementedError
+
+    def query_many(self, vectors, top_k=20, include_metadata=True, filter=None):
+        """Run one query per row of `vectors` and return a list of results."""
+        return [self.query(vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+                for vector in vectors]
+
+    def candidate_features(self, results):
+        """Re-ranking feature arrays (see app.ranking) aligned with results['matches']."""
+        return metadata_features([m['metadata'] for m in results['matches']])
+
+    def describe_index_stats(self):
+        raise NotImplementedError
+
+
+class PineconeIndex(VectorIndex):
+    """Remote Pinecone index."""
+
+    def __init__(self, index_name, api_key=None):
+        from pinecone import Pinecone
+
+        pc = Pinecone(api_key=api_key)
+        self.index = pc.Index(index_name)
+
+    def query(self, vector, top_k=20, include_metadata=True, filter=None):
+        return self.index.query(
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
+            filter=self._pinecone_filter(filter),
+            top_k=top_k,
+            include_metadata=include_metadata
+        )
+
+    @staticmethod
+    def _pinecone_filter(filter):
+        if not filter:
+            return None
+        clauses = {}
+        for field, cond in filter.items():
+            if field in RANGE_FILTERS:
+                low, high = cond
+                clause = {}
+                if low is not None:
+                    clause['$gte'] = low
+                if high is not None:
+                    clause['$lte'] = high
+                clauses[field] = clause
+            else:
+                clauses[field] = {'$in': list(cond)}
+        return clauses
+
+    def describe_index_stats(self):
+        return self.index.describe_index_stats()
+
+
+def _as_matrix(vectors, rows):
+    """Vectors as a float32 (rows x dimension) matrix.
+
+    2-D input keeps its shape, so an empty catalog keeps its dimension;
+    anything else is reshaped to one row per id.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors if vectors.ndim == 2 else vectors.reshape(rows, -1)
+
+
+def _normalize(vectors):
+    """L2-normalize rows so a dot product is the cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class MetadataTable:
+    """Per-row metadata held in NumPy arrays, so `load` can memory-map it.
+
+    Each row's dict is stored as UTF-8 JSON in one byte array delimited by an
+    offsets array, and decoded only for the rows a query returns. Filter and
+    ranking fields are also kept as columns: int32 codes into a value list for
+    CATEGORICAL_FILTERS and float64 arrays for NUMERIC_COLUMNS. Only the
+    categorical value lists are Python objects.
+    """
+
+    def __init__(self, blob, offsets, columns, vocabularies):
+        self.blob = blob
+        self.offsets = offsets
+        self.columns = columns
+        self.vocabularies = vocabularies
+
+    @classmethod
+    def from_dicts(cls, metadata):
+        metadata = list(metadata)
+        docs = [json.dumps(m, separators=(',', ':')).encode() for m in metadata]
+        offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+        np.cumsum([len(doc) for doc in docs], out=offsets[1:])
+        columns, vocabularies = {}, {}
+        for field in CATEGORICAL_FILTERS:
+            codes = {}
+            columns[field] = np.fromiter(
+                (codes.setdefault(m.get(field), len(codes)) for m in metadata),
+                dtype=np.int32, count=len(metadata)
+            )
+            vocabularies[field] = list(codes)
+        for field in NUMERIC_COLUMNS:
+            values = [m.get(field) for m in metadata]
+            if field == 'most_recent_upload':
+                columns[field] = timestamps(values)
+            else:
+                columns[field] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return cls(np.frombuffer(b''.join(docs), dtype=np.uint8), offsets, columns, vocabularies)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Load a table written by `save`, or a legacy metadata.json list."""
+        if not os.path.exists(os.path.join(path, 'metadata.npy')):
+            with open(os.path.join(path, 'metadata.json')) as f:
+                return cls.from_dicts(json.load(f))
+
+        def array(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+
+        with open(os.path.join(path, 'metadata.columns.json')) as f:
+            layout = json.load(f)
+        columns = {field: array(f'metadata.{field}') for field in layout['columns']}
+        return cls(array('metadata'), array('metadata.offsets'), columns, layout['vocabularies'])
+
+    def save(self, path):
+        np.save(os.path.join(path, 'metadata.npy'), self.blob)
+        np.save(os.path.join(path, 'metadata.offsets.npy'), self.offsets)
+        for field, column in self.columns.items():
+            np.save(os.path.join(path, f'metadata.{field}.npy'), column)
+        with open(os.path.join(path, 'metadata.columns.json'), 'w') as f:
+            json.dump({'columns': list(self.columns), 'vocabularies': self.vocabularies}, f)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return json.loads(self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes())
+
+    def take(self, rows):
+        """A new in-memory table holding `rows` in the given order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.offsets[rows], self.offsets[rows + 1]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=offsets[1:])
+        blob = np.concatenate([np.empty(0, dtype=np.uint8)] +
+                              [self.blob[start:end] for start, end in zip(starts, ends)])
+        columns = {field: np.asarray(column)[rows] for field, column in self.columns.items()}
+        return MetadataTable(blob, offsets, columns, self.vocabularies)
+
+
+def as_metadata_table(metadata):
+    """Accept either a MetadataTable or a sequence of metadata dicts."""
+    if isinstance(metadata, MetadataTable):
+        return metadata
+    return MetadataTable.from_dicts(metadata)
+
+
+class NumpyIndex(VectorIndex):
+    """In-process exact search over a contiguous float32 embedding matrix.
+
+    Row i of `vectors` belongs to `ids[i]`; `metadata[i]` is the side table
+    entry returned with each match (see MetadataTable).
+    """
+
+    def __init__(self, ids, vectors, metadata):
+        vectors = _as_matrix(vectors, len(ids))
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = np.ascontiguousarray(_normalize(vectors), dtype=np.float32)
+        self.dimension = self.vectors.shape[1]
+        self._init_metadata(metadata)
+
+    def _init_metadata(self, metadata):
+        self.metadata = as_metadata_table(metadata)
+        if len(self.metadata) != len(self.ids):
+            raise ValueError("metadata must have one entry per vector")
+        self._mask_cache = LRUCache(maxsize=64)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with `save` from a directory."""
+        ids = np.load(os.path.join(path, 'ids.npy'))
+        vectors = np.load(os.path.join(path, 'vectors.npy'))
+        return cls(ids, vectors, MetadataTable.load(path, mmap_mode='r'))
+
+    def save(self, path):
+        """Write ids, vectors and metadata to a directory."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'ids.npy'), self.ids)
+        np.save(os.path.join(path, 'vectors.npy'), self.vectors)
+        self.metadata.save(path)
+
+    def _top_k(self, scores, top_k):
+        """Indices of the top_k scores, best first."""
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _format(self, rows, scores, include_metadata):
+        """Build a query response from row positions and their scores."""
+        matches = []
+        for row, score in zip(rows, scores):
+            match = {'id': str(self.ids[row]), 'score': float(score)}
+            if include_metadata:
+                match['metadata'] = self.metadata[row]
+            matches.append(match)
+        # Row positions let candidate_features read columns instead of metadata dicts
+        return {'matches': matches, 'rows': rows}
+
+    def candidate_features(self, results):
+        rows = results['rows']
+        return {field: np.asarray(self.metadata.columns[field][rows]) for field in FEATURE_FIELDS}
+
+    def _condition_mask(self, field, cond):
+        column = self.metadata.columns[field]
+        if field in RANGE_FILTERS:
+            low, high = cond
+            mask = ~np.isnan(column)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+            return mask
+        wanted = [code for code, value in enumerate(self.metadata.vocabularies[field]) if value in cond]
+        return np.isin(column, wanted)
+
+    def filter_mask(self, filter):
+        """Boolean row mask for a filter, combining one cached mask per condition."""
+        mask = None
+        for field, cond in sorted(filter.items()):
+            key = (field, tuple(cond))
+            condition_mask = self._mask_cache.get(key)
+            if condition_mask is None:
+                condition_mask = self._condition_mask(field, cond)
+                self._mask_cache.set(key, condition_mask)
+            mask = condition_mask if mask is None else mask & condition_mask
+        return mask
+
+    def _search(self, scores, top_k, rows, include_metadata):
+        if rows is None:
+            top = self._top_k(scores, top_k)
+            return self._format(top, scores[top], include_metadata)
+        # Rank only the rows that pass the filter, so a narrow filter still fills top_k
+        return self._search_rows(scores[rows], top_k, rows, include_metadata)
+
+    def _search_rows(self, row_scores, top_k, rows, include_metadata):
+        """Top-k among a subset of rows, given the scores of just those rows."""
+        top = self._top_k(row_scores, top_k)
+        return self._format(rows[top], row_scores[top], include_metadata)
+
+    def _scores(self, queries):
+        """Cosine scores of normalized (queries x dimension) against every row."""
+        return queries @ self.vectors.T
+
+    def query(self, vector, top_k=20, include_metadata=True, filter=None):
+        return self.query_many([vector], top_k, include_metadata, filter)[0]
+
+    def query_many(self, vectors, top_k=20, include_metadata=True, filter=None):
+        # One (queries x items) matrix multiply per chunk of the batch
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        rows = np.flatnonzero(self.filter_mask(filter)) if filter else None
+        step = max(1, SCORE_MEMORY_BYTES // (4 * max(1, len(self.ids))))
+        results = []
+        for start in range(0, len(vectors), step):
+            scores = self._scores(vectors[start:start + step])
+            results.extend(self._search(row_scores, top_k, rows, include_metadata) for row_scores in scores)
+        return results
+
+    def describe_index_stats(self):
+        return {
+            'dimension': int(self.dimension),
+            'total_vector_count': int(len(self.ids))
+        }
+
+
+class QuantizedIndex(NumpyIndex):
+    """Exact search over int8 embeddings with one float32 scale per row.
+
+    `load` opens the arrays with numpy.memmap, so every worker process shares
+    the same page-cache pages instead of holding its own float32 copy.
+    """
+
+    # Rows dequantized per block while scoring, bounding the float32 scratch space
+    block_size = 8192
+
+    def __init__(self, ids, codes, scales, metadata):
+        self.ids = np.asarray(ids)
+        self.codes = codes
+        self.scales = scales
+        self.dimension = codes.shape[1]
+        self._init_metadata(metadata)
+
+    @staticmethod
+    def quantize(vectors):
+        """Symmetric per-row int8 quantization of normalized vectors."""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @classmethod
+    def from_vectors(cls, ids, vectors, metadata):
+        codes, scales = cls.quantize(_as_matrix(vectors, len(ids)))
+        return cls(ids, codes, scales, metadata)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index saved with `save` from a directory."""
+        ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        codes = np.load(os.path.join(path, 'vectors.int8.npy'), mmap_mode='r')
+        scales = np.load(os.path.join(path, 'scales.npy'), mmap_mode='r')
+        return cls(ids, codes, scales, MetadataTable.load(path, mmap_mode='r'))
+
+    def save(self, path):
+        """Write ids, int8 codes, scales and metadata to a directory."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'ids.npy'), np.asarray(self.ids, dtype=np.int64))
+        np.save(os.path.join(path, 'vectors.int8.npy'), np.asarray(self.codes, dtype=np.int8))
+        np.save(os.path.join(path, 'scales.npy'), np.asarray(self.scales, dtype=np.float32))
+        self.metadata.save(path)
+
+    def _scores(self, queries):
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), self.block_size):
+            end = start + self.block_size
+            block = self.codes[start:end].astype(np.float32)
+            scores[:, start:end] = (queries @ block.T) * self.scales[start:end]
+        return scores
+
+
+def save_atomic(index, path, arrays=None):
+    """
+    Save an index into a fresh directory, then swap it in place of `path`.
+
+    Workers that memory-mapped the old files keep reading them until they
+    reload; rewriting files in place would truncate pages they still map.
+
+    Args:
+        index: Index with a `save(path)` method
+        path (str): Directory to replace
+        arrays (dict): Extra file name -> array written alongside the index
+    """
+    tmp_path = path.rstrip('/') + '.tmp'
+    old_path = path.rstrip('/') + '.old'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    index.save(tmp_path)
+    for name, array in (arrays or {}).items():
+        np.save(os.path.join(tmp_path, name), array)
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def quantize_index(src_path, dst_path):
+    """Convert a float32 index directory into the int8 format read by QuantizedIndex."""
+    source = NumpyIndex.load(src_path)
+    save_atomic(QuantizedIndex.from_vectors(source.ids, source.vectors, source.metadata), dst_path)
+
+
+def create_index(backend, index_name=None, api_key=None, path=None, nprobe=8):
+    """Build the vector index for the configured backend ('pinecone', 'numpy', 'quantized' or 'ivf')."""
+    if backend == 'pinecone':
+        return PineconeIndex(index_name, api_key=api_key)
+    if backend in ('numpy', 'quantized', 'ivf'):
+        if not path:
+            raise ValueError(f"VECTOR_INDEX_PATH is required for the {backend} backend.")
+        if backend == 'quantized':
+            return QuantizedIndex.load(path)
+        if backend == 'ivf':
+            from app.ivf_index import IVFIndex
+            return IVFIndex.load(path, nprobe=nprobe)
+        return NumpyIndex.load(path)
+    raise ValueError(f"Unknown vector backend: {backend}")
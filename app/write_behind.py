@@ -0,0 +1,207 @@
+# write_behind.py
+import atexit
+import logging
+import math
+import threading
+import time
+from sqlalchemy import BigInteger, Float, Integer, cast, column, update, values
+from sqlalchemy.exc import DataError
+from app import db
+from app.etag import bump_table_versions
+from app.fields import MAX_BIGINT, MAX_INTEGER
+from app.models import Influencer
+
+logger = logging.getLogger(__name__)
+
+influencers = Influencer.__table__
+
+# Columns that can be written behind, with the SQL type of their VALUES column
+METRIC_COLUMNS = {
+    'followers_count': BigInteger,
+    'average_views': BigInteger,
+    'engagement_rate': Float
+}
+
+def metric_value(name, value):
+    """`value` as stored in metric column `name`; raises ValueError when it cannot be."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number.")
+    if METRIC_COLUMNS[name] is BigInteger:
+        if value != int(value) or not 0 <= value <= MAX_BIGINT:
+            raise ValueError(f"{name} must be an integer between 0 and {MAX_BIGINT}.")
+        return int(value)
+    return float(value)
+
+
+def update_metrics(session, updates, chunk_size=1000):
+    """
+    Write influencer metrics with one multi-row UPDATE ... FROM (VALUES ...) per chunk.
+
+    Args:
+        session: SQLAlchemy session; the caller commits
+        updates (dict): influencer id -> {metric column: value}
+    """
+    groups = {}
+    for influencer_id, metrics in updates.items():
+        groups.setdefault(tuple(sorted(metrics)), []).append(dict(metrics, id=influencer_id))
+    for names, rows in groups.items():
+        rows.sort(key=lambda row: row['id'])  # Lock rows in id order
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            data = values(
+                column('id', Integer), *(column(name, METRIC_COLUMNS[name]) for name in names),
+                name='metrics'
+            ).data([tuple(row[name] for name in ('id',) + names) for row in chunk])
+            session.execute(
+                update(influencers)
+                .where(influencers.c.id == data.c.id)
+                # Cast, since VALUES columns holding only NULLs would otherwise be text
+                .values({name: cast(data.c[name], METRIC_COLUMNS[name]) for name in names})
+            )
+    if updates:
+        bump_table_versions(session, ['influencers'])
+
+
+class MetricWriteBehind:
+    """
+    In-process queue of influencer metric updates, flushed by a background thread.
+
+    Updates are coalesced per influencer id and column (last write wins). The
+    worker flushes once METRIC_FLUSH_SIZE influencers are pending or the oldest
+    update is METRIC_FLUSH_INTERVAL seconds old, and once more at exit. Until
+    then the updates exist only in this process.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.pending = {}
+        self.oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_flush_lag = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_size = app.config['METRIC_FLUSH_SIZE']
+        self.flush_interval = app.config['METRIC_FLUSH_INTERVAL']
+        self.max_pending = app.config['METRIC_QUEUE_MAX']
+        if app.config['METRIC_WRITE_BEHIND']:
+            atexit.register(self.flush)
+
+    def enqueue(self, updates):
+        """
+        Queue {influencer id: {column: value}}; returns False when the queue is full.
+        """
+        with self._cond:
+            new_ids = sum(1 for influencer_id in updates if influencer_id not in self.pending)
+            if len(self.pending) + new_ids > self.max_pending:
+                return False
+            for influencer_id, metrics in updates.items():
+                self.pending.setdefault(influencer_id, {}).update(metrics)
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            if len(self.pending) >= self.flush_size:
+                self._cond.notify()
+            self._start()
+        return True
+
+    def _start(self):
+        # Started on first use so that forked workers each run their own thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='metric-write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due():
+                    timeout = self.flush_interval
+                    if self.oldest is not None:
+                        timeout = max(0.0, self.oldest + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+            if not self.flush():
+                # Back off instead of retrying a failing database in a tight loop
+                time.sleep(self.flush_interval)
+
+    def _due(self):
+        # Caller holds the lock
+        if not self.pending:
+            return False
+        return (len(self.pending) >= self.flush_size
+                or time.monotonic() - self.oldest >= self.flush_interval)
+
+    def flush(self):
+        """
+        Write everything pending; returns False if that failed.
+
+        A failed batch is queued again beneath any values that arrived meanwhile.
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, oldest = self.pending, self.oldest
+                self.pending, self.oldest = {}, None
+            if not batch:
+                return True
+            try:
+                with self.app.app_context():
+                    dropped = self._write(batch)
+                    from app.matching import invalidate_match_results
+                    invalidate_match_results(batch)
+            except Exception as e:
+                logger.error(f"Flushing {len(batch)} influencer metric updates failed: {e}")
+                with self._cond:
+                    self.errors += 1
+                    for influencer_id, metrics in batch.items():
+                        self.pending[influencer_id] = dict(metrics, **self.pending.get(influencer_id, {}))
+                    self.oldest = oldest if self.oldest is None else min(oldest, self.oldest)
+                return False
+            with self._cond:
+                self.flushes += 1
+                self.flushed_rows += len(batch) - dropped
+                self.dropped += dropped
+                self.last_flush_lag = time.monotonic() - oldest
+            return True
+
+    def _write(self, batch):
+        """
+        Commit a batch; returns how many updates were dropped.
+
+        Values the database rejects would fail every retry, so a rejected batch
+        is split in halves until the offending updates are isolated and dropped.
+        """
+        try:
+            update_metrics(db.session, batch)
+            db.session.commit()
+            return 0
+        except DataError as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                logger.error(f"Dropping influencer metric update {batch}: {e.orig}")
+                return 1
+        items = list(batch.items())
+        half = len(items) // 2
+        return self._write(dict(items[:half])) + self._write(dict(items[half:]))
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self.pending),
+                # Seconds the oldest queued update has waited so far
+                'lag': time.monotonic() - self.oldest if self.oldest is not None else 0.0,
+                # Seconds between the oldest update of the last flush being queued and committed
+                'last_flush_lag': self.last_flush_lag,
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows,
+                'errors': self.errors,
+                'dropped': self.dropped
+            }
+
+
+metric_writes = MetricWriteBehind()
@@ -10,4 +10,55 @@ class Config:
         os.environ.get('DATABASE_URL') or
         f"postgresql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
     )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Vector search backend for /api/influencers/match: 'pinecone', 'numpy', 'quantized' or 'ivf'
+    VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND') or 'pinecone'
+    VECTOR_INDEX_PATH = os.environ.get('VECTOR_INDEX_PATH')
+    PINECONE_API_KEY = os.environ.get('PINECONE_API_KEY')
+    PINECONE_INDEX_NAME = os.environ.get('PINECONE_INDEX_NAME') or 'experiment'
+    # Inverted lists scanned per query by the 'ivf' backend
+    VECTOR_IVF_NPROBE = int(os.environ.get('VECTOR_IVF_NPROBE', 8))
+    EMBEDDING_MODEL_NAME = os.environ.get('EMBEDDING_MODEL_NAME') or 'all-MiniLM-L6-v2'
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get('QUERY_EMBEDDING_CACHE_SIZE', 1024))
+    # Cached /match responses; writes to an influencer drop the entries that contain it
+    MATCH_RESULT_CACHE_SIZE = int(os.environ.get('MATCH_RESULT_CACHE_SIZE', 2048))
+    MATCH_RESULT_CACHE_TTL = int(os.environ.get('MATCH_RESULT_CACHE_TTL', 300))
+    # Load the model and index in a background thread at startup instead of on the first /match
+    MATCH_WARMUP = os.environ.get('MATCH_WARMUP', '').lower() in ('1', 'true', 'yes')
+    # Hybrid re-ranking: over-fetch candidates, then blend semantic score with engagement,
+    # reach, views and upload recency (weights in app/ranking.py, overridable per request)
+    MATCH_RERANK = os.environ.get('MATCH_RERANK', 'true').lower() in ('1', 'true', 'yes')
+    MATCH_RERANK_OVERFETCH = int(os.environ.get('MATCH_RERANK_OVERFETCH', 5))
+    MATCH_RERANK_MAX_CANDIDATES = int(os.environ.get('MATCH_RERANK_MAX_CANDIDATES', 1000))
+    MATCH_RECENCY_HALF_LIFE_DAYS = float(os.environ.get('MATCH_RECENCY_HALF_LIFE_DAYS', 30))
+
+    # Seconds before /api/influencers/random reloads its cached id array in the background
+    RANDOM_SAMPLE_ID_TTL = int(os.environ.get('RANDOM_SAMPLE_ID_TTL', 300))
+    # Seconds before the in-memory hashtag autocomplete index is rebuilt in the background
+    HASHTAG_INDEX_TTL = int(os.environ.get('HASHTAG_INDEX_TTL', 600))
+
+    # Cached GET responses for the brand and hashtag lists: backend ('memory'),
+    # entries kept, and seconds each route's entries live (writes also drop them)
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND') or 'memory'
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+    BRAND_LIST_CACHE_TTL = int(os.environ.get('BRAND_LIST_CACHE_TTL', 300))
+    HASHTAG_LIST_CACHE_TTL = int(os.environ.get('HASHTAG_LIST_CACHE_TTL', 300))
+
+    # 'orjson' encodes responses with orjson when it is installed, 'default' keeps Flask's encoder
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+    # gzip/brotli (when installed) for buffered responses of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+    # Records per INSERT ... ON CONFLICT statement (and transaction) in POST /api/influencers/bulk
+    BULK_UPSERT_CHUNK_SIZE = int(os.environ.get('BULK_UPSERT_CHUNK_SIZE', 1000))
+
+    # POST /api/influencers/metrics: queue updates in memory and write them from a background
+    # thread (coalesced per influencer) instead of committing in the request
+    METRIC_WRITE_BEHIND = os.environ.get('METRIC_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+    METRIC_FLUSH_SIZE = int(os.environ.get('METRIC_FLUSH_SIZE', 1000))
+    METRIC_FLUSH_INTERVAL = float(os.environ.get('METRIC_FLUSH_INTERVAL', 2.0))
+    METRIC_QUEUE_MAX = int(os.environ.get('METRIC_QUEUE_MAX', 100000))
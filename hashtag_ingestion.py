@@ -6,6 +6,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from app.models import Hashtag  # Import the Hashtag model
+from app.etag import bump_table_versions
 
 # Configure logging
 logging.basicConfig(
@@ -169,6 +170,8 @@ def load_hashtag_data(csv_path, batch_size=500, skip_existing=True):
             try:
                 # Bulk insert operation
                 session.bulk_save_objects(batch_records)
+                # Bulk saves skip the flush events that bump the ETag versions
+                bump_table_versions(session, ['hashtags'])
                 session.commit()
                 inserted_count += len(batch_records)
                 logger.info(f"Processed hashtag batch: {i} to {min(i+batch_size, total_rows)}")
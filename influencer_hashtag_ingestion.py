@@ -3,6 +3,8 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from app.etag import bump_table_versions
+from app.hashtag_stats import refresh_hashtag_stats
 
 # Load environment variables
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -64,6 +66,9 @@ def load_influencer_hashtag_data(csv_path):
             """)
             
             session.execute(insert_stmt, batch)
+            bump_table_versions(session, ['influencer_hashtag'])
+            # Keep hashtags.influencer_count / total_uses in step with the batch
+            refresh_hashtag_stats(session, {row['hashtag_id'] for row in batch})
             session.commit()
             print(f"Inserted batch {i//batch_size + 1} of {(len(data) + batch_size - 1)//batch_size}")
         
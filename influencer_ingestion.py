@@ -6,6 +6,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from app.models import Influencer  # Import the Influencer model
+from app.etag import bump_table_versions
 
 # Configure logging
 logging.basicConfig(
@@ -146,6 +147,8 @@ def load_influencer_data(csv_path, batch_size=1000):
             try:
                 # Bulk insert operation
                 session.bulk_save_objects(batch_records)
+                # Bulk saves skip the flush events that bump the ETag versions
+                bump_table_versions(session, ['influencers'])
                 session.commit()
                 logger.info(f"Processed batch: {i} to {min(i+batch_size, total_rows)}")
                 
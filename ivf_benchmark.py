@@ -0,0 +1,63 @@
+import argparse
+import time
+import numpy as np
+from app.ivf_index import IVFIndex
+from app.vector_index import NumpyIndex
+
+
+def synthetic_embeddings(n, dimension=384, clusters=200, seed=0):
+    """Clustered unit vectors, roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dimension)).astype(np.float32)
+    return vectors
+
+
+def time_queries(index, queries, top_k, **kwargs):
+    """Mean milliseconds per query and the id lists returned."""
+    start = time.perf_counter()
+    results = [index.query(q, top_k=top_k, include_metadata=False, **kwargs) for q in queries]
+    elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+    return elapsed, [[m['id'] for m in r['matches']] for r in results]
+
+
+def benchmark(vectors, nprobes, num_queries=200, top_k=20, nlist=None, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(len(vectors))
+    metadata = [{}] * len(vectors)
+    exact = NumpyIndex(ids, vectors, metadata)
+    build_start = time.perf_counter()
+    ivf = IVFIndex.build(ids, vectors, metadata, nlist=nlist, seed=seed)
+    build_seconds = time.perf_counter() - build_start
+
+    # Queries are perturbed catalog vectors, so each has true near neighbours
+    picks = rng.choice(len(vectors), num_queries, replace=False)
+    queries = exact.vectors[picks] + 0.05 * rng.normal(size=(num_queries, exact.dimension)).astype(np.float32)
+
+    exact_ms, truth = time_queries(exact, queries, top_k)
+    print(f"\nCatalog size {len(vectors)}: nlist={len(ivf.centroids)}, built in {build_seconds:.1f}s")
+    print(f"  exact        {exact_ms:8.3f} ms/query  recall@{top_k} 1.000")
+    for nprobe in nprobes:
+        ivf_ms, found = time_queries(ivf, queries, top_k, nprobe=nprobe)
+        recall = np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)])
+        print(f"  nprobe={nprobe:<5d} {ivf_ms:8.3f} ms/query  recall@{top_k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall and latency of the IVF index against exact search.")
+    parser.add_argument('--index', help="Float32 index directory to benchmark instead of synthetic data")
+    parser.add_argument('--sizes', default='20000,80000,320000',
+                        help="Synthetic catalog sizes, comma separated")
+    parser.add_argument('--nprobe', default='1,4,8,16,32', help="nprobe values, comma separated")
+    parser.add_argument('--nlist', type=int, default=None, help="Inverted lists (default 4 * sqrt(n))")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=20)
+    args = parser.parse_args()
+
+    nprobes = [int(n) for n in args.nprobe.split(',')]
+    if args.index:
+        datasets = [NumpyIndex.load(args.index).vectors]
+    else:
+        datasets = [synthetic_embeddings(int(n)) for n in args.sizes.split(',')]
+    for vectors in datasets:
+        benchmark(vectors, nprobes, num_queries=args.queries, top_k=args.top_k, nlist=args.nlist)